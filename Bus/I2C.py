@@ -1,15 +1,140 @@
 from time import sleep
 from Logger.Logger import Logger
 import time
-import busio
-import board
+import heapq
+import threading
+from Bus.Simulation import isSimulated, SimI2C
+
+if not isSimulated():
+    import busio
+    import board
+
+# bus priorities, a waiting transaction with a higher priority goes first
+I2C_PRIORITY_TELEMETRY = 0
+I2C_PRIORITY_SENSOR = 1
+I2C_PRIORITY_PUMP = 2
+
+
+class PriorityLock():
+    """ Lock handed to the waiter with the highest priority, waiters with the same priority are served in order """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.waiting = [] # heap of (-priority, ticket)
+        self.ticket = 0
+        self.owner = None
+
+    def acquire(self, priority = 0):
+        with self.condition:
+            entry = (-priority, self.ticket)
+            self.ticket += 1
+            heapq.heappush(self.waiting, entry)
+            while self.owner != None or self.waiting[0] != entry:
+                self.condition.wait()
+            heapq.heappop(self.waiting)
+            self.owner = threading.get_ident()
+
+    def release(self):
+        with self.condition:
+            self.owner = None
+            self.condition.notify_all()
+
+    def isOwner(self):
+        return self.owner == threading.get_ident()
+
+
+class I2CBus():
+    """
+    Process wide owner of the I2C bus. Every user gets a SharedI2C from getDevice, which behaves like
+    busio.I2C but serializes its transactions on one PriorityLock and records latency and errors per address.
+    """
+    _i2c = None
+    _lock = PriorityLock()
+    _setup_lock = threading.Lock()
+    _stats = {} # address -> [transactions, errors, busy seconds, max seconds, waiting seconds]
+    _stats_lock = threading.Lock()
+
+    def getBus():
+        with I2CBus._setup_lock:
+            if(I2CBus._i2c == None):
+                I2CBus._i2c = SimI2C() if isSimulated() else busio.I2C(board.SCL, board.SDA)
+            return I2CBus._i2c
+
+    def getDevice(priority = I2C_PRIORITY_SENSOR):
+        I2CBus.getBus()
+        return SharedI2C(priority)
+
+    def record(address : int, busy : float, waiting : float, error : bool):
+        with I2CBus._stats_lock:
+            stats = I2CBus._stats.setdefault(address, [0, 0, 0, 0, 0])
+            stats[0] += 1
+            stats[1] += int(error)
+            stats[2] += busy
+            stats[3] = max(stats[3], busy)
+            stats[4] += waiting
+
+    def getStats():
+        """ returns address -> dict of transaction count, errors, mean/max latency and mean wait for the bus """
+        with I2CBus._stats_lock:
+            return {address : {"transactions" : s[0], "errors" : s[1], "mean_latency" : s[2] / s[0],
+                               "max_latency" : s[3], "mean_wait" : s[4] / s[0]}
+                    for address, s in I2CBus._stats.items()}
+
+
+class SharedI2C():
+    """ busio.I2C interface on the shared bus, also usable by adafruit drivers (try_lock/unlock around transactions) """
+
+    def __init__(self, priority : int):
+        self.priority = priority
+
+    def try_lock(self):
+        I2CBus._lock.acquire(self.priority)
+        return True
+
+    def unlock(self):
+        I2CBus._lock.release()
+
+    def readfrom_into(self, address, buffer, **kwargs):
+        return self._transaction(address, I2CBus.getBus().readfrom_into, address, buffer, **kwargs)
+
+    def writeto(self, address, buffer, **kwargs):
+        return self._transaction(address, I2CBus.getBus().writeto, address, buffer, **kwargs)
+
+    def writeto_then_readfrom(self, address, buffer_out, buffer_in, **kwargs):
+        return self._transaction(address, I2CBus.getBus().writeto_then_readfrom, address, buffer_out, buffer_in, **kwargs)
+
+    def scan(self):
+        return self._transaction(None, I2CBus.getBus().scan)
+
+    def deinit(self):
+        # the bus is shared, it stays open
+        pass
+
+    def _transaction(self, address, func, *args, **kwargs):
+        start = time.monotonic()
+        # drivers holding the lock through try_lock run their transactions directly
+        locked = not I2CBus._lock.isOwner()
+        if(locked):
+            I2CBus._lock.acquire(self.priority)
+        acquired = time.monotonic()
+        error = True
+        try:
+            result = func(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            if(locked):
+                I2CBus._lock.release()
+            I2CBus.record(address, time.monotonic() - acquired, acquired - start, error)
+
 
 class PythonWire():
-    def __init__(self, address, maxBytesForWrite=200):
+    def __init__(self, address, maxBytesForWrite=200, priority = I2C_PRIORITY_SENSOR):
         self.address = address
         self.buffer = []
         self.i2c = None
         self.maxBytesForWrite = maxBytesForWrite
+        self.priority = priority
         self.logger = Logger("I2C Bus")
 
     def begin(self):
@@ -17,7 +142,7 @@ class PythonWire():
         self.logger.logInfo("Setting up i2c")
 
         try:
-            self.i2c = busio.I2C(board.SCL, board.SDA)
+            self.i2c = I2CBus.getDevice(self.priority)
         except Exception as e:
             self.logger.logErr("Error opening i2c connection",e)
 
@@ -42,12 +167,23 @@ class PythonWire():
         except Exception as e:
             self.logger.logErr("Error reading bytes from address: {} size: {}".format(address,size),e)
 
-    def endTransmission(self):
+    def readInto(self, address, buffer, start = 0, end = None):
+        """ reads into buffer[start:end] without allocating, returns False on errors """
+        try:
+            self.i2c.readfrom_into(address, buffer, start=start, end=len(buffer) if end == None else end)
+            return True
+        except Exception as e:
+            self.logger.logErr("Error reading bytes from address: {} into buffer[{}:{}]".format(address,start,end),e)
+            return False
 
+    def endTransmission(self):
+        """ writes the buffer, returns False on errors """
         try:
             self.i2c.writeto(self.address, bytes(self.buffer), stop=False)
+            return True
         except Exception as e:
             self.logger.logErr("Error writing data at the of transmission input: {}".format(self.buffer),e)
+            return False
     
     def close(self):
         try:
@@ -3,7 +3,9 @@ from subprocess import check_output
 
 from sys import platform
 
-if platform == "linux":
+from Bus.Simulation import isSimulated, SimSpiDev
+
+if platform == "linux" and not isSimulated():
     import spidev
 
 from Logger.Logger import Logger
@@ -33,7 +35,7 @@ class SpidevBus:
         self.init()
 
     def init(self):
-        self.spi = spidev.SpiDev()
+        self.spi = SimSpiDev() if isSimulated() else spidev.SpiDev()
         self.spi.open(self.bus, self.device)
         self.spi.max_speed_hz = self.speed
         self.spi.mode = self.mode
@@ -42,6 +44,15 @@ class SpidevBus:
     def read(self, nbytes: int):
         return self.spi.readbytes(nbytes)
 
+    """ Fills buffer[start:end] (bytearray or numpy uint8 array) with transfers of at most chunk_size bytes, the spidev default buffer size """
+
+    def readinto(self, buffer, start: int = 0, end: int = None, chunk_size: int = 4096):
+        end = len(buffer) if end == None else end
+        for pos in range(start, end, chunk_size):
+            n = min(chunk_size, end - pos)
+            buffer[pos:pos + n] = self.spi.readbytes(n)
+        return end - start
+
     def write(self, byte_array):
         return self.spi.writebytes(byte_array)
 
@@ -0,0 +1,458 @@
+import os
+import math
+import time
+import random
+import threading
+
+# "hardware" uses spidev/busio, "simulation" the device models below
+BUS_BACKEND = os.environ.get("BUS_BACKEND", "hardware")
+
+SIM_REALTIME = True # transactions sleep for their simulated duration
+SIM_I2C_THROUGHPUT = 100_000 / 9 # bytes/s, 100 kHz with ack bit
+SIM_I2C_LATENCY = 0.0001 # seconds per transaction
+SIM_SPI_LATENCY = 0.00005 # seconds per transaction, the throughput follows max_speed_hz
+SIM_SEED = 42
+
+SIM_MEA_ARM_DELAY = 0.1 # seconds until the MEA board answers the arming byte with 82
+SIM_MEA_PATTERN_SAMPLES = 32768 # precomputed samples served cyclically
+SIM_MEA_CHANNELS = 16
+
+SIM_TEMPERATURE = 36.8 # C°, MAX31865 base temperature
+SIM_TEMPERATURE_NOISE = 0.05
+
+"""
+In process models of the devices on the SPI and I2C buses (and of RPi.GPIO), used when BUS_BACKEND is "simulation"
+(e.g. BUS_BACKEND=simulation python ... on a workstation). Every model has a latency per transaction
+and a throughput in bytes/s; with SIM_REALTIME the calling thread sleeps for that time, otherwise
+the simulated time is only added up in busyTime.
+"""
+
+def isSimulated():
+    return BUS_BACKEND == "simulation"
+
+
+class SimDevice():
+    def __init__(self, latency : float, throughput : float):
+        self.latency = latency
+        self.throughput = throughput
+        self.busyTime = 0
+        self.transactions = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def failNext(self, n = 1):
+        """ the next n transactions raise OSError like a device not acknowledging """
+        self.failures += n
+
+    def transaction(self, nbytes : int):
+        """ accounts (and with SIM_REALTIME waits) for a transaction of nbytes """
+        duration = self.latency + (nbytes / self.throughput if self.throughput else 0)
+        with self.lock:
+            self.transactions += 1
+            self.busyTime += duration
+            failed = self.failures > 0
+            self.failures = max(0, self.failures - 1)
+        if(SIM_REALTIME):
+            time.sleep(duration)
+        if(failed):
+            raise OSError(121, "Remote I/O error (simulated)")
+
+
+""" GPIO """
+
+class SimPWM():
+    def __init__(self, pin : int, frequency : float):
+        self.pin = pin
+        self.frequency = frequency
+        self.dutyCycle = None
+
+    def start(self, dutyCycle : float):
+        self.dutyCycle = dutyCycle
+
+    def ChangeDutyCycle(self, dutyCycle : float):
+        self.dutyCycle = dutyCycle
+
+    def ChangeFrequency(self, frequency : float):
+        self.frequency = frequency
+
+    def stop(self):
+        self.dutyCycle = None
+
+
+class SimGPIO():
+    """ stands in for the RPi.GPIO module, pins holds the last output of every pin """
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    pins = {}
+
+    def setmode(mode):
+        pass
+
+    def setwarnings(flag):
+        pass
+
+    def setup(pin, direction, initial = -1, pull_up_down = None):
+        SimGPIO.pins.setdefault(pin, False)
+
+    def output(pin, state):
+        SimGPIO.pins[pin] = bool(state)
+
+    def input(pin):
+        return SimGPIO.pins.get(pin, False)
+
+    def cleanup(pin = None):
+        pass
+
+    PWM = SimPWM
+
+
+""" SPI """
+
+class MeaBoardModel(SimDevice):
+    """ MEA readout board: answers the arming byte 39 (40 with stimulation) with 82, then streams NNNNDDDD DDDDDDDD samples """
+    IDLE = 0
+    ARMING = 1
+    STREAMING = 2
+
+    def __init__(self, latency = SIM_SPI_LATENCY, throughput = None, armDelay = SIM_MEA_ARM_DELAY):
+        super().__init__(latency, throughput)
+        self.armDelay = armDelay
+        self.state = MeaBoardModel.IDLE
+        self.armedAt = 0
+        self.stimulation = False
+        self.pattern = MeaBoardModel.createPattern()
+        self.pos = 0
+
+    def createPattern(samples = SIM_MEA_PATTERN_SAMPLES, channels = SIM_MEA_CHANNELS):
+        rand = random.Random(SIM_SEED)
+        data = bytearray()
+        for n in range(samples):
+            channel = n % channels
+            value = int(2048 + 600 * math.sin(2 * math.pi * n / 997 + channel) + rand.randint(-40, 40)) & 0x0FFF
+            data += bytes([(channel << 4) | (value >> 8), value & 0xFF])
+        return bytes(data)
+
+    def write(self, data : list):
+        if(len(data) > 0 and data[0] in (39, 40)):
+            self.state = MeaBoardModel.ARMING
+            self.armedAt = time.monotonic()
+            self.stimulation = data[0] == 40
+            self.pos = 0
+
+    def read(self, n : int):
+        if(self.state == MeaBoardModel.ARMING):
+            if(time.monotonic() - self.armedAt < self.armDelay):
+                return [0] * n
+            self.state = MeaBoardModel.STREAMING
+            return [82] + self.read(n - 1) if n > 1 else [82]
+
+        if(self.state == MeaBoardModel.STREAMING):
+            out = bytearray()
+            while len(out) < n:
+                chunk = self.pattern[self.pos:self.pos + n - len(out)]
+                out += chunk
+                self.pos = (self.pos + len(chunk)) % len(self.pattern)
+            return list(out)
+
+        return [0] * n
+
+    def reset(self):
+        self.state = MeaBoardModel.IDLE
+
+
+class SimSpiDev():
+    """ spidev.SpiDev on a device model, the MEA board by default """
+    models = {} # (bus, device) -> model, created on first open
+
+    def __init__(self):
+        self.model = None
+        self.max_speed_hz = 500_000
+        self.mode = 0
+        self.no_cs = False
+
+    def open(self, bus : int, device : int):
+        self.model = SimSpiDev.models.setdefault((bus, device), MeaBoardModel())
+
+    def close(self):
+        if(self.model != None):
+            self.model.reset()
+        self.model = None
+
+    def _transaction(self, nbytes : int):
+        if(self.model.throughput == None):
+            # throughput follows the clock like on the real bus
+            duration = self.model.latency + nbytes * 8 / self.max_speed_hz
+            self.model.busyTime += duration
+            self.model.transactions += 1
+            if(SIM_REALTIME):
+                time.sleep(duration)
+        else:
+            self.model.transaction(nbytes)
+
+    def readbytes(self, n : int):
+        self._transaction(n)
+        return self.model.read(n)
+
+    def writebytes(self, data):
+        self._transaction(len(data))
+        self.model.write(list(data))
+
+    def xfer(self, data, speed_hz = 0, delay_usecs = 0, bits_per_word = 0):
+        self._transaction(len(data))
+        self.model.write(list(data))
+        return [0] * len(data)
+
+    xfer2 = xfer
+
+
+class Max31865Model(SimDevice):
+    """ MAX31865 RTD converter with a PT100 and 430 Ohm reference at temperature """
+    R0 = 100
+    REFERENCE = 430
+    A = 3.9083e-3
+    B = -5.775e-7
+
+    def __init__(self, temperature = SIM_TEMPERATURE, noise = SIM_TEMPERATURE_NOISE, latency = SIM_SPI_LATENCY, throughput = 500_000 / 8):
+        super().__init__(latency, throughput)
+        self.temperature = temperature
+        self.noise = noise
+        self.random = random.Random(SIM_SEED)
+        self.registers = bytearray(8)
+        self.pointer = 0
+
+    def rtdRaw(self):
+        t = self.temperature + self.random.uniform(-self.noise, self.noise)
+        resistance = Max31865Model.R0 * (1 + Max31865Model.A * t + Max31865Model.B * t * t)
+        return int(resistance / Max31865Model.REFERENCE * 32768) << 1
+
+    def write(self, data : bytes):
+        if(len(data) == 0):
+            return
+        self.pointer = data[0] & 0x7F
+        if(data[0] & 0x80):
+            for value in data[1:]:
+                self.registers[self.pointer % 8] = value
+                self.pointer += 1
+
+    def read(self, n : int):
+        raw = self.rtdRaw()
+        self.registers[1] = raw >> 8
+        self.registers[2] = raw & 0xFF
+        out = bytes(self.registers[(self.pointer + i) % 8] for i in range(n))
+        self.pointer += n
+        return out
+
+
+class SimSPI():
+    """ busio.SPI on a single device model, for drivers using adafruit_bus_device """
+
+    def __init__(self, model):
+        self.model = model
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def configure(self, **kwargs):
+        pass
+
+    def write(self, buffer, start = 0, end = None):
+        data = bytes(buffer[start:len(buffer) if end == None else end])
+        self.model.transaction(len(data))
+        self.model.write(data)
+
+    def readinto(self, buffer, start = 0, end = None, write_value = 0):
+        end = len(buffer) if end == None else end
+        self.model.transaction(end - start)
+        buffer[start:end] = self.model.read(end - start)
+
+    def write_readinto(self, buffer_out, buffer_in, out_start = 0, out_end = None, in_start = 0, in_end = None):
+        self.write(buffer_out, out_start, out_end)
+        self.readinto(buffer_in, in_start, in_end)
+
+    def deinit(self):
+        pass
+
+
+""" I2C """
+
+class I2CRegisterDevice(SimDevice):
+    """ device with 8 bit registers, a write sets the register pointer and writes the following bytes """
+
+    def __init__(self, latency = SIM_I2C_LATENCY, throughput = SIM_I2C_THROUGHPUT):
+        super().__init__(latency, throughput)
+        self.registers = bytearray(256)
+        self.pointer = 0
+
+    def write(self, data : bytes):
+        if(len(data) == 0):
+            return
+        self.pointer = data[0]
+        for value in data[1:]:
+            self.writeRegister(self.pointer, value)
+            self.pointer = (self.pointer + 1) % 256
+        self.written(data[0], data[1:])
+
+    def read(self, n : int):
+        out = bytearray(n)
+        for i in range(n):
+            out[i] = self.readRegister(self.pointer)
+            self.pointer = (self.pointer + 1) % 256
+        return out
+
+    def writeRegister(self, register : int, value : int):
+        self.registers[register] = value
+
+    def readRegister(self, register : int):
+        return self.registers[register]
+
+    def written(self, register : int, data : bytes):
+        """ called after a write transaction """
+        pass
+
+
+class MPU6050Model(I2CRegisterDevice):
+    """ MPU6050 at rest: 1 g on z, no rotation """
+    WHO_AM_I = 0x75
+    PWR_MGMT_1 = 0x6B
+    DATA = 0x3B
+
+    def __init__(self, temperature = 30.0, **kwargs):
+        super().__init__(**kwargs)
+        self.temperature = temperature
+        self.random = random.Random(SIM_SEED)
+        self.registers[MPU6050Model.WHO_AM_I] = 0x68
+        self.registers[MPU6050Model.PWR_MGMT_1] = 0x40
+
+    def writeRegister(self, register : int, value : int):
+        # the reset bit clears itself
+        self.registers[register] = value & 0x7F if register == MPU6050Model.PWR_MGMT_1 else value
+
+    def readRegister(self, register : int):
+        if(register == MPU6050Model.DATA):
+            self._sample()
+        return self.registers[register]
+
+    def _sample(self):
+        scale = 16384 >> ((self.registers[0x1C] >> 3) & 0x3) # LSB/g of the accelerometer range
+        values = [self.random.randint(-20, 20), self.random.randint(-20, 20), scale + self.random.randint(-20, 20),
+                  int((self.temperature - 36.53) * 340),
+                  self.random.randint(-5, 5), self.random.randint(-5, 5), self.random.randint(-5, 5)]
+        for n, value in enumerate(values):
+            value &= 0xFFFF
+            self.registers[MPU6050Model.DATA + 2 * n] = value >> 8
+            self.registers[MPU6050Model.DATA + 2 * n + 1] = value & 0xFF
+
+
+class DS3231Model(I2CRegisterDevice):
+    """ DS3231 running from the system clock plus the offset of the last time set """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.offset = 0
+        self.registers[0x11] = 25 # C°
+
+    def readRegister(self, register : int):
+        if(register == 0x00):
+            self._updateTime()
+        return self.registers[register]
+
+    def written(self, register : int, data : bytes):
+        if(register == 0x00 and len(data) >= 7):
+            r = [DS3231Model._fromBcd(b) for b in data[:7]]
+            t = time.struct_time((2000 + r[6], r[5] & 0x1F, r[4], r[2] & 0x3F, r[1], r[0], r[3] - 1, -1, -1))
+            self.offset = time.mktime(t) - time.time()
+
+    def _updateTime(self):
+        t = time.localtime(time.time() + self.offset)
+        values = [t.tm_sec, t.tm_min, t.tm_hour, t.tm_wday + 1, t.tm_mday, t.tm_mon, t.tm_year % 100]
+        for n, value in enumerate(values):
+            self.registers[n] = DS3231Model._toBcd(value)
+
+    def _toBcd(value : int):
+        return (value // 10) << 4 | value % 10
+
+    def _fromBcd(value : int):
+        return (value >> 4) * 10 + (value & 0x0F)
+
+
+class BartelsHighdriverModel(I2CRegisterDevice):
+    """ Bartels mp-Highdriver, the amplitudes of the 4 pumps are in 0x06 - 0x09 """
+
+    def getAmplitudes(self):
+        return list(self.registers[0x06:0x0A])
+
+
+class ISSEndpointModel(SimDevice):
+    """ ISS side of the telemetry link, records the packets written and serves scripted bytes on reads """
+
+    def __init__(self, latency = SIM_I2C_LATENCY, throughput = SIM_I2C_THROUGHPUT):
+        super().__init__(latency, throughput)
+        self.received = []
+        self.outgoing = bytearray()
+
+    def send(self, data : bytes):
+        """ bytes returned by the next reads, e.g. the start string """
+        self.outgoing += data
+
+    def write(self, data : bytes):
+        # packets are framed as 1, length, payload
+        if(len(data) >= 2 and data[0] == 1):
+            self.received.append(bytes(data[2:2 + data[1]]))
+
+    def read(self, n : int):
+        out = bytes(self.outgoing[:n]).ljust(n, b"\0")
+        del self.outgoing[:n]
+        return out
+
+
+def createI2CDevices():
+    return {0x69 : MPU6050Model(), 0x68 : DS3231Model(), 0x78 : BartelsHighdriverModel(), 42 : ISSEndpointModel()}
+
+
+class SimI2C():
+    """ busio.I2C on the device models of devices, address -> model """
+
+    def __init__(self, devices : dict = None):
+        self.devices = createI2CDevices() if devices == None else devices
+        self.lock = threading.Lock()
+
+    def try_lock(self):
+        return self.lock.acquire(blocking=False)
+
+    def unlock(self):
+        self.lock.release()
+
+    def scan(self):
+        return sorted(self.devices.keys())
+
+    def _device(self, address : int):
+        device = self.devices.get(address)
+        if(device == None):
+            raise OSError(121, "No device at address {} (simulated)".format(address))
+        return device
+
+    def writeto(self, address : int, buffer, *, start = 0, end = None, stop = True):
+        device = self._device(address)
+        data = bytes(buffer[start:len(buffer) if end == None else end])
+        device.transaction(len(data) + 1)
+        device.write(data)
+
+    def readfrom_into(self, address : int, buffer, *, start = 0, end = None):
+        device = self._device(address)
+        end = len(buffer) if end == None else end
+        device.transaction(end - start + 1)
+        buffer[start:end] = device.read(end - start)
+
+    def writeto_then_readfrom(self, address : int, buffer_out, buffer_in, *, out_start = 0, out_end = None, in_start = 0, in_end = None, stop = False):
+        self.writeto(address, buffer_out, start=out_start, end=out_end)
+        self.readfrom_into(address, buffer_in, start=in_start, end=in_end)
+
+    def deinit(self):
+        pass
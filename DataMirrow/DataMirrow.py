@@ -1,5 +1,5 @@
 from Logger.Logger import Logger, LOG_DIRECTORY
-from Telemetry.Telemetry import PackageQueue
+from Telemetry.Telemetry import PackageQueue, DropPolicy
 import shutil
 from os import listdir, remove
 from os.path import isfile, join, getmtime
@@ -9,8 +9,9 @@ BACKUP_PATH = "/mnt/usb/"
 class DataMirrow():
 
     def __init__(self):
-        self.files_to_backup = PackageQueue()
-        self.files_to_overwrite = PackageQueue()
+        # a file changed again before it was copied is only queued once
+        self.files_to_backup = PackageQueue(dropPolicy=DropPolicy.COALESCE)
+        self.files_to_overwrite = PackageQueue(dropPolicy=DropPolicy.COALESCE)
         self.dates_of_files = dict()
         self.logger = Logger("DataMirrow")
 
@@ -38,7 +39,8 @@ class DataMirrow():
         try:
             for f in listdir(LOG_DIRECTORY):
                 file_path = join(LOG_DIRECTORY, f)
-                if isfile(file_path) and not f.startswith('.'):
+                # .tmp files are archives of rotated logs still being compressed
+                if isfile(file_path) and not f.startswith('.') and not f.endswith('.tmp'):
                     date = getmtime(file_path)
                     listed = f in self.dates_of_files.keys()
                     if(listed and self.dates_of_files[f] != date):
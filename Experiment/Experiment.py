@@ -91,10 +91,12 @@ class Experiment(TelemetryDataSource):
             self.iss_signal_received = data.getIssSignalReceived()
             self.iss_signal_received_on = data.getIssSignalReceivedOn()
             self.n_pump_cycles = data.getNPumpCycles()
+            self.rs.recoverTelemetry(self.iss)
             self.restore()
         else:
             self.logger.logInfo("No power outage detected: Starting System")
             self.rs.createRestoreFile()
+            self.iss.discardSpool()
             self.run()
 
     def estimateSystemState(self, seconds):
@@ -139,6 +141,9 @@ class Experiment(TelemetryDataSource):
 
 
     def run(self, sday = 0):
+        # telemetry is sent by the transmitter thread of ISSTelemetry during the whole experiment
+        self.iss.startTransmitting()
+
         if(not self.iss_signal_received):
             self.logger.logInfo("Running Pre Launch Software")
             self.preLaunchSoftware(sday)
@@ -155,7 +160,7 @@ class Experiment(TelemetryDataSource):
     def preLaunchSoftware(self, sday):
         if(sday < 1):
             #self.preLaunchTests()
-            heat_tele = TimedLoop(functions_to_call = [self.ts._updateLoop, self.iss.transmit], 
+            heat_tele = TimedLoop(functions_to_call = [self.ts._updateLoop], 
                                     on_exit = [self.ts.meaMeasurementShutOff],
                                     parallel = False, delay_between_calls = 0.01)
             heat_tele.timedRun(30 * MINUTE)
@@ -191,7 +196,6 @@ class Experiment(TelemetryDataSource):
                     heating.stop()
                     self.setIssSignalReceived(True)
                     return True
-                self.iss.transmit()
                 time.sleep(5)
 
             self.rtc.setSystemTime()
@@ -204,7 +208,7 @@ class Experiment(TelemetryDataSource):
         heating = StartStopLoop(functions_to_call = [self.ts._updateLoop], 
                                 on_exit = [self.ts.meaMeasurementShutOff],
                                 parallel = False, delay_between_calls = 0.01)
-        heat_tele = TimedLoop(functions_to_call = [self.ts._updateLoop, self.iss.transmit], 
+        heat_tele = TimedLoop(functions_to_call = [self.ts._updateLoop], 
                                 on_exit = [self.ts.meaMeasurementShutOff],
                                 parallel = False, delay_between_calls = 0.01)
         copy = StartStopLoop(functions_to_call = [self.mirr.backupFile], 
@@ -324,8 +328,8 @@ class Experiment(TelemetryDataSource):
 
 
     def measurementSequence(self, stimulate = False):
-        sensor_readout = TimedLoop(functions_to_call = [self.mpu.read, self.iss.transmit], parallel=False)
-        heating = TimedLoop(functions_to_call=[self.ts._updateLoop, self.iss.transmit], 
+        sensor_readout = TimedLoop(functions_to_call = [self.mpu.read], parallel=False)
+        heating = TimedLoop(functions_to_call=[self.ts._updateLoop], 
                               on_exit = [self.ts.meaMeasurementShutOff], 
                               parallel=True , delay_between_calls=0.01)
 
@@ -1,4 +1,9 @@
-import RPi.GPIO as GPIO
+from Bus.Simulation import isSimulated, SimGPIO
+
+if isSimulated():
+    GPIO = SimGPIO
+else:
+    import RPi.GPIO as GPIO
 from Logger.Logger import Logger
 from time import sleep
 
@@ -12,7 +17,7 @@ BOARD2BCM=[
 
 class GPIOMapping(): 
     def convertTOBCM(pin : int):
-        logger = Logger("Pin Converter")
+        logger = Logger.get("Pin Converter")
         if(pin >= 1 and pin <= 40):
             if(BOARD2BCM[pin-1] != -1):
                 return BOARD2BCM[pin-1]
@@ -23,6 +28,7 @@ class SingleGPIO():
     def __init__(self,PIN:int, LOG = True, CONVERT=True):
         self.PIN = GPIOMapping.convertTOBCM(PIN) if CONVERT else PIN
         self.state = False
+        self.teleFields = [] # telemetry fields the state is pushed to
         self.logger = Logger("PIN {pin}".format(pin = PIN),LOG)
 
     def setup(self):
@@ -43,6 +49,8 @@ class SingleGPIO():
         except Exception as e:
             self.logger.logErr("Errpr setting pin",e)
         self.state = state
+        for field in self.teleFields:
+            field.set(state)
     
     def close(self):
         GPIO.setmode(GPIO.BCM)
@@ -1,15 +1,22 @@
 import time
-import RPi.GPIO as GPIO
-import board
-import adafruit_max31865
 import threading
 from Logger.Logger import Logger
 from simple_pid import PID
 from ShiftRegister.shiftRegister import ShiftRegister
 from GPIO.gpio import GPIOMapping
 from GPIO.digitalInOut import DigitalInOut
-from Telemetry.Telemetry import TelemetryDataSource,TeleDatatypes
+from Telemetry.Telemetry import TelemetryDataSource,TeleDatatypes,TelemetryRegistry
 from GPIO.gpio import SingleGPIO
+from Bus.Simulation import isSimulated, SimGPIO, SimSPI, Max31865Model
+
+if isSimulated():
+    GPIO = SimGPIO
+else:
+    import RPi.GPIO as GPIO
+    import board
+
+# the driver also runs on the simulated SPI bus, it's only imported once a board connects
+adafruit_max31865 = None
 
 MIN_TEMP = -10 # C°
 MAX_TEMP = 100 # C°
@@ -30,6 +37,9 @@ MAX_SIMPLE_CONTROLLER_OUTPUT = 65 #%
 
 TEMP_SETPOINT = 36.8 #C°
 
+# telemetry fields aggregated over the time between two packets, name -> stats
+AGGREGATED_TELEMETRY_FIELDS = {"heatpad_{}".format(n) : ("mean", "max") for n in range(1,7)}
+
 class DataGrouping():
     def __init__(self,h1_1:int,h1_2:int,h1_3:int, h2_1:int, h2_2:int, h2_3:int, h3_1:int, h3_2:int, h3_3:int, h4_1:int, h4_2:int, h4_3:int, h5_1:int, h5_2:int, h5_3:int, h6_1:int, h6_2:int, h6_3:int):
         self.logger = Logger("DataGrouping")
@@ -127,15 +137,15 @@ class PIDController:
     def getOutput(self, input : float):
         try:
             if(input > EMERGENCY_TEMP_UPPER or input < EMERGENCY_TEMP_LOWER):
-                self.logger.logErr("PIDController not capable to keep temperature in emergency bounds (current temperature: {})".format(input))
+                self.logger.logErr("PIDController not capable to keep temperature in emergency bounds (current temperature: {})", args=(input,))
                 return self.backup.getOutput(input)
             
             output = self.controller(input)
-            self.logger.logInfo("Calculated output (input: {}, output: {})".format(input,output))
+            self.logger.logDebug("Calculated output (input: {}, output: {})", args=(input,output))
             return output
         
         except Exception as e:
-            self.logger.logErr("Error calculating new output (input : {})".format(input), e)
+            self.logger.logErr("Error calculating new output (input : {})", e, args=(input,))
             return self.backup.getOutput(input)
 
 class SimpleController():
@@ -151,9 +161,9 @@ class SimpleController():
         elif(self.setpoint < t and t < MAX_TEMP):
             output = MIN_SIMPLE_CONTROLLER_OUTPUT
         else:
-            self.logger.logErr("No valid temperature readout (temp :{})".format(t))
+            self.logger.logErr("No valid temperature readout (temp :{})", args=(t,))
 
-        self.logger.logInfo("Caculated output to {}".format(output))
+        self.logger.logDebug("Caculated output to {}", args=(output,))
         return output
 
 class Multiplexer():
@@ -180,7 +190,7 @@ class Multiplexer():
             self._setPins(state0,state1,state2)
 
     def _setPins(self, STATE_PIN0:int, STATE_PIN1:int, STATE_PIN2:int):
-        self.logger.logInfo("setting pins ({p1}, {p2}, {p3})".format(p1 = STATE_PIN0, p2=STATE_PIN1, p3 = STATE_PIN2))
+        self.logger.logDebug("setting pins ({}, {}, {})", args=(STATE_PIN0, STATE_PIN1, STATE_PIN2))
         
         self.SP0_PIN._set(STATE_PIN0)
         self.SP1_PIN._set(STATE_PIN1)
@@ -227,7 +237,10 @@ class TemperatureReadoutBoard():
     def connect(self):
         try:
             # Connect Board    def validate(): # lower < upper
-            spi = board.SPI()
+            global adafruit_max31865
+            if(adafruit_max31865 == None):
+                import adafruit_max31865
+            spi = SimSPI(Max31865Model()) if isSimulated() else board.SPI()
             self.cs = DigitalInOut(self.SELECTOR_PIN, shtReg=self.shtReg)
             self.sensor = adafruit_max31865.MAX31865(spi, self.cs)  
 
@@ -283,10 +296,10 @@ class TemperatureReadoutBoard():
                 temp = self.sensor.temperature + self.CValues[heatpadNumber]
             
         except Exception as e:
-            self.logger.logErr("Error measuring temperature of heatpad {num}".format(num = heatpadNumber),e)
+            self.logger.logErr("Error measuring temperature of heatpad {}", e, args=(heatpadNumber,))
             return -242
         
-        self.logger.logInfo("Measured Heatpad {num} Temperature {temp} C°".format(num = heatpadNumber, temp = temp))
+        self.logger.logDebug("Measured Heatpad {} Temperature {} C°", args=(heatpadNumber, temp))
         self.heatpadTemps[heatpadNumber] = temp + self.CValues[heatpadNumber]
         return temp + self.CValues[heatpadNumber]
         
@@ -318,21 +331,21 @@ class Heatpad():
     
     def set(self, output):
         try:
-            self.logger.logInfo("Setting heatpad {pin} to output of {out}".format(pin = self.CONTROL_PIN,out = output))
+            self.logger.logDebug("Setting heatpad {} to output of {}", args=(self.CONTROL_PIN, output))
             self.controlValue = output
             GPIO.setmode(GPIO.BCM)
             GPIO.setup(self.CONTROL_PIN, GPIO.OUT)
             self.output.ChangeDutyCycle(self.controlValue)
             
         except Exception as e:
-            self.logger.logErr("Error setting heatpad {pin} to output of {out}".format(pin = self.CONTROL_PIN,out = output))
+            self.logger.logErr("Error setting heatpad {} to output of {}", args=(self.CONTROL_PIN, output))
 
     def off(self):
         self.logger.logInfo("Shutting of heatpad")
         self.set(0.0)
 
 class TemperatureSystem(TelemetryDataSource):
-    def __init__(self, CS1_PIN : int, CS2_PIN : int, CS3_PIN : int, H1_PIN: int, H2_PIN: int, H3_PIN: int, H4_PIN : int, H5_PIN : int, H6_PIN : int, MULT1_PIN : int, MULT2_PIN : int, MULT3_PIN : int, shtReg : ShiftRegister, SETPOINT = TEMP_SETPOINT  , LOG = True):
+    def __init__(self, CS1_PIN : int, CS2_PIN : int, CS3_PIN : int, H1_PIN: int, H2_PIN: int, H3_PIN: int, H4_PIN : int, H5_PIN : int, H6_PIN : int, MULT1_PIN : int, MULT2_PIN : int, MULT3_PIN : int, shtReg : ShiftRegister, SETPOINT = TEMP_SETPOINT  , LOG = True, aggregatedFields : 'dict[str,tuple]' = AGGREGATED_TELEMETRY_FIELDS):
         self.logger = Logger("Temperatue System",LOG)
 
         # Multiplexer Mapping
@@ -365,7 +378,14 @@ class TemperatureSystem(TelemetryDataSource):
         self.reading = False
         self.thread = None
 
+        # Telemetry
+        self.teleRegistry = TelemetryRegistry()
+        self.teleTemperatures = [self.teleRegistry.register("tmp{}_{}".format(n, m), TeleDatatypes.FLOAT) for n in range(1,7) for m in range(1,4)]
+        self.teleHeatpads = [self.teleRegistry.register(name, TeleDatatypes.INT, stats=aggregatedFields.get(name)) for name in ["heatpad_{}".format(n) for n in range(1,7)]]
+        self.teleMultiplexer = self.teleRegistry.register("multiplexer", TeleDatatypes.INT)
+
         self.setup()
+        self.pushTeleData()
 
     def setup(self):
         self.logger.logInfo("Connecting Hardware")
@@ -403,7 +423,7 @@ class TemperatureSystem(TelemetryDataSource):
 
                 temp = readoutBoard.measure(heatpad)
 
-                self.logger.logInfo("Heatpad {num} : temperature {t}°".format(num = heatpad ,t = temp))
+                self.logger.logDebug("Heatpad {} : temperature {}°", args=(heatpad, temp))
                 self.logger.logSensorData("heatpad_raw_{}".format(heatpad), {"temperature_raw" : temp}) 
                 
         self.reading = False
@@ -418,7 +438,7 @@ class TemperatureSystem(TelemetryDataSource):
             self.logger.logErr("Error measuring temperatures in thread")
 
     def _updateLoop(self):
-        self.logger.logInfo("Measurement Loop")   
+        self.logger.logDebug("Measurement Loop")
         
         self.readout()
         
@@ -430,9 +450,11 @@ class TemperatureSystem(TelemetryDataSource):
         for i,t in enumerate(temperatures):
             out = self.pidCs[i].getOutput(t)
             self.heatpads[i].set(out)
-            self.logger.logInfo("Heatpad {num} : temperature {t}° : output {o}% ".format(num = i ,t = t, o = out))
+            self.logger.logDebug("Heatpad {} : temperature {}° : output {}% ", args=(i, t, out))
             self.logger.logSensorData("heatpad{}".format(i),{"temperature":t, "output":out})
 
+        self.pushTeleData()
+
     def getTemperatures(self):
         return  self.temperatureReadoutBoards[0].getTemperatures() + self.temperatureReadoutBoards[1].getTemperatures() + self.temperatureReadoutBoards[2].getTemperatures()
 
@@ -446,37 +468,19 @@ class TemperatureSystem(TelemetryDataSource):
     def meaMeasurementShutOff(self):
         for heatpad in self.heatpads:
             heatpad.off()
+        self.pushTeleData()
     
+    def pushTeleData(self):
+        """ pushes the latest temperatures, heatpad outputs and multiplexer state to the telemetry fields """
+        temps = [temp for temperatures in self.getSortedTemperatures() for temp in temperatures]
+        for field, temp in zip(self.teleTemperatures, temps):
+            field.set(temp)
+        for field, heatpad in zip(self.teleHeatpads, self.heatpads):
+            field.set(heatpad.controlValue)
+        self.teleMultiplexer.set(self.multiplexer.getState())
+
     def getTeleData(self):
-        temps =  [temp for temperatures in self.getSortedTemperatures() for temp in temperatures]
-        multi = self.multiplexer.getState()
-        heatpads = [h.controlValue for h in self.heatpads]
-
-        return {"tmp1_1" : (temps[0],TeleDatatypes.FLOAT),
-                "tmp1_2" : (temps[1],TeleDatatypes.FLOAT),
-                "tmp1_3" : (temps[2],TeleDatatypes.FLOAT),
-                "tmp2_1" : (temps[3],TeleDatatypes.FLOAT),
-                "tmp2_2" : (temps[4],TeleDatatypes.FLOAT),
-                "tmp2_3" : (temps[5],TeleDatatypes.FLOAT),
-                "tmp3_1" : (temps[6],TeleDatatypes.FLOAT),
-                "tmp3_2" : (temps[7],TeleDatatypes.FLOAT),
-                "tmp3_3" : (temps[8],TeleDatatypes.FLOAT),
-                "tmp4_1" : (temps[9],TeleDatatypes.FLOAT),
-                "tmp4_2" : (temps[10],TeleDatatypes.FLOAT),
-                "tmp4_3" : (temps[11],TeleDatatypes.FLOAT),
-                "tmp5_1" : (temps[12],TeleDatatypes.FLOAT),
-                "tmp5_2" : (temps[13],TeleDatatypes.FLOAT),
-                "tmp5_3" : (temps[14],TeleDatatypes.FLOAT),
-                "tmp6_1" : (temps[15],TeleDatatypes.FLOAT),
-                "tmp6_2" : (temps[16],TeleDatatypes.FLOAT),
-                "tmp6_3" : (temps[17],TeleDatatypes.FLOAT),
-                "heatpad_1" : (heatpads[0],TeleDatatypes.INT),
-                "heatpad_2" : (heatpads[1],TeleDatatypes.INT),
-                "heatpad_3" : (heatpads[2],TeleDatatypes.INT),
-                "heatpad_4" : (heatpads[3],TeleDatatypes.INT),
-                "heatpad_5" : (heatpads[4],TeleDatatypes.INT),
-                "heatpad_6" : (heatpads[5],TeleDatatypes.INT),
-                "multiplexer" : (multi,TeleDatatypes.INT)}
+        return self.teleRegistry.getTeleData()
 
     def selfTest(self):
         logger = Logger("Temerature System TEST")
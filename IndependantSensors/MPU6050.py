@@ -1,7 +1,7 @@
 from Logger.Logger import Logger
 import subprocess
 import time
-import board
+from Bus.I2C import I2CBus, I2C_PRIORITY_SENSOR
 import adafruit_mpu6050
 from Telemetry.Telemetry import TelemetryDataSource,TeleDatatypes
 
@@ -9,7 +9,7 @@ class MPU6050(TelemetryDataSource):
     def __init__(self):
         self.logger = Logger("MPU6050")
         try:
-            self.i2c = board.I2C()
+            self.i2c = I2CBus.getDevice(I2C_PRIORITY_SENSOR)
             self.acc = [-100,-100,-100]
             self.gyro = [-100,-100,-100]
             self.temp = -242
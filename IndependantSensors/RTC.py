@@ -1,9 +1,7 @@
-import RPi.GPIO as GPIO
 import time
 from Logger.Logger import Logger
-from HeatingSystem.heatingSystem import GPIOMapping
 import threading
-import board
+from Bus.I2C import I2CBus, I2C_PRIORITY_SENSOR
 import adafruit_ds3231
 from datetime import datetime
 from Telemetry.Telemetry import TelemetryDataSource,TeleDatatypes
@@ -21,7 +19,7 @@ class RTC(TelemetryDataSource):
     def connect(self):
         self.logger.logInfo("Connecting RTC")
         try:
-            i2c = i2c = board.I2C()
+            i2c = I2CBus.getDevice(I2C_PRIORITY_SENSOR)
             self.rtc = adafruit_ds3231.DS3231(i2c)
         except Exception as e:
             self.logger.logErr("Error Connecting to RTC",e)
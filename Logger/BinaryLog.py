@@ -0,0 +1,97 @@
+import os
+import json
+import struct
+from Logger.LogWriter import LogFile
+from Logger.LogStaging import LogStaging
+
+BINARY_MAGIC = b"MCSPBIN1"
+BINARY_VERSION = 1
+BINARY_TIME_FIELD = "time"
+BINARY_VALUE_DTYPE = "<f8"
+
+"""
+Fixed schema binary sensor log:
+    magic (8 bytes) | header length (uint32, little endian) | JSON header | records
+The JSON header is padded with spaces so the records start 8 byte aligned.
+Every record is a timestamp followed by one float64 per field of the schema.
+"""
+
+class BinarySensorFile(LogFile):
+    def __init__(self, path : str, fields : 'list[str]', buffering = -1):
+        self.fields = fields
+        self.record = struct.Struct("<" + "d" * (len(fields) + 1))
+
+        headerPath = BinarySensorFile._findHeader(path)
+        if(headerPath != None and BinarySensorFile.readHeader(headerPath)[0] != fields):
+            raise ValueError("Existing binary log {} has a different schema".format(path))
+
+        super().__init__(path, buffering, binary=True)
+        if(headerPath == None):
+            self.file.write(BinarySensorFile.createHeader(fields))
+
+    def openMatching(path : str, fields : 'list[str]', buffering = -1):
+        """ opens path or, if it holds another schema, the first of <name>_1.bin, <name>_2.bin, ... that is new or matches """
+        base = path[:-4] if path.endswith(".bin") else path
+        n = 0
+        while True:
+            headerPath = BinarySensorFile._findHeader(path)
+            if(headerPath == None or BinarySensorFile.readHeader(headerPath)[0] == fields):
+                return BinarySensorFile(path, fields, buffering)
+            n += 1
+            path = "{}_{}.bin".format(base, n)
+
+    def _findHeader(path : str):
+        # the header is either on the SD card already or still in the staging tier
+        for p in [path, LogStaging.getStagingPath(path)]:
+            if(os.path.isfile(p) and os.path.getsize(p) > 0):
+                return p
+        return None
+
+    def createHeader(fields : 'list[str]'):
+        columns = [[BINARY_TIME_FIELD, BINARY_VALUE_DTYPE]] + [[f, BINARY_VALUE_DTYPE] for f in fields]
+        header = json.dumps({"version" : BINARY_VERSION, "fields" : columns}).encode('utf-8')
+        headerStart = len(BINARY_MAGIC) + 4
+        header += b" " * (-(headerStart + len(header)) % 8)
+        return BINARY_MAGIC + struct.pack("<I", len(header)) + header
+
+    def readHeader(path : str):
+        """ returns (value field names, list of [name, dtype] incl. time, offset of the first record) """
+        with open(path, mode='rb') as file:
+            magic = file.read(len(BINARY_MAGIC))
+            if(magic != BINARY_MAGIC):
+                raise ValueError("{} is not a binary sensor log".format(path))
+            (length,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(length).decode('utf-8'))
+        columns = header["fields"]
+        return [c[0] for c in columns[1:]], columns, len(BINARY_MAGIC) + 4 + length
+
+    def schemaFromData(data : dict):
+        """ returns the field names of data or None if it can't be stored as numbers """
+        for value in data.values():
+            if(BinarySensorFile._toNumber(value) == None):
+                return None
+        return list(data.keys())
+
+    def encode(self, data : dict):
+        """ returns the values of data in schema order or None if data doesn't match the schema """
+        if(len(data) != len(self.fields)):
+            return None
+        values = []
+        for f in self.fields:
+            value = BinarySensorFile._toNumber(data.get(f))
+            if(value == None):
+                return None
+            values.append(value)
+        return values
+
+    def writeRecord(self, timestamp : float, values : list):
+        self.file.write(self.record.pack(timestamp, *values))
+        self.dirty = True
+
+    def _toNumber(value):
+        # telemetry dicts are logged directly, their values are (value, TeleDatatypes) tuples
+        if(type(value) == tuple and len(value) > 0):
+            value = value[0]
+        if(type(value) in (int, float, bool)):
+            return float(value)
+        return None
@@ -0,0 +1,54 @@
+import os
+import re
+import numpy as np
+from Logger.BinaryLog import BinarySensorFile, BINARY_VALUE_DTYPE
+
+""" Post flight loader for the binary sensor logs written by BinarySensorFile """
+
+def loadSensorFile(path : str):
+    """ memory maps a binary sensor log, returns a structured array with one column per field """
+    fields, columns, offset = BinarySensorFile.readHeader(path)
+    dtype = np.dtype([(name, typ) for name, typ in columns])
+
+    # a record cut off by a power loss is ignored
+    n_records = (os.path.getsize(path) - offset) // dtype.itemsize
+    if(n_records <= 0):
+        return np.empty(0, dtype=dtype)
+
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(n_records,))
+
+def findSensorFiles(sensorName : str, directory : str):
+    # sensor files are named <sensorName><unix time in seconds>.bin, <sensorName><time>_<n>.bin after a schema change
+    pattern = re.compile("^" + re.escape(sensorName) + r"(\d{10})(?:_(\d+))?\.bin$")
+    files = []
+    for f in os.listdir(directory):
+        match = pattern.match(f)
+        if(match != None):
+            files.append((int(match.group(1)), int(match.group(2) or 0), f))
+    return [os.path.join(directory, f) for _, _, f in sorted(files)]
+
+def loadSensorStream(sensorName : str, directory : str):
+    """ loads every file of a sensor in time order and returns a dict of field name -> array """
+    files = [loadSensorFile(path) for path in findSensorFiles(sensorName, directory)]
+    files = [f for f in files if len(f) > 0]
+
+    if(len(files) == 0):
+        return {}
+
+    if(len(files) == 1):
+        stream = files[0]
+    elif(all(f.dtype == files[0].dtype for f in files)):
+        stream = np.concatenate(files)
+    else:
+        # files with different schemas are merged over all fields, missing fields are NaN
+        names = []
+        for f in files:
+            names += [name for name in f.dtype.names if not name in names]
+        stream = np.full(sum(len(f) for f in files), np.nan, dtype=[(name, BINARY_VALUE_DTYPE) for name in names])
+        pos = 0
+        for f in files:
+            for name in f.dtype.names:
+                stream[name][pos:pos + len(f)] = f[name]
+            pos += len(f)
+
+    return {name : stream[name] for name in stream.dtype.names}
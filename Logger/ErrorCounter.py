@@ -1,6 +1,9 @@
 from Telemetry.Telemetry import TeleDatatypes,TelemetryDataSource
 from Logger.Logger import Logger
 
+RECENT_ERROR_WINDOW = 60 # seconds
+
 class ErrorCounter(TelemetryDataSource):
     def getTeleData(self):
-        return {"error_count" : (Logger.getErrorCount(), TeleDatatypes.INT)}
\ No newline at end of file
+        return {"error_count" : (Logger.getErrorCount(), TeleDatatypes.INT),
+                "error_recent" : (Logger.countRecentErrors(RECENT_ERROR_WINDOW), TeleDatatypes.INT)}
\ No newline at end of file
@@ -0,0 +1,39 @@
+import threading
+
+ERROR_FLOOD_WINDOW = 30 # seconds identical errors are coalesced
+
+""" Coalesces identical error records, only the first one of a window is written and the rest is counted """
+
+class ErrorFloodFilter():
+    def __init__(self, window = ERROR_FLOOD_WINDOW):
+        self.window = window
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def accept(self, logger, t : float, msg : str, e : Exception, args : tuple):
+        """ returns (write the record, summary of the previous window or None) """
+        key = (logger.name, msg, repr(args), repr(e))
+        with self.lock:
+            entry = self.entries.get(key)
+            if(entry != None and t - entry[1] < self.window):
+                entry[2] += 1
+                return False, None
+
+            # only the text of the exception is kept, the exception itself would keep its frames alive
+            self.entries[key] = [logger, t, 0, msg, None if e == None else str(e), args]
+
+        if(entry != None and entry[2] > 0):
+            return True, entry
+        return True, None
+
+    def collectExpired(self, t : float, all = False):
+        """ removes finished windows, returns entries [logger, start, suppressed count, msg, error text, args] that suppressed records """
+        summaries = []
+        with self.lock:
+            for key in list(self.entries.keys()):
+                entry = self.entries[key]
+                if(all or t - entry[1] >= self.window):
+                    del self.entries[key]
+                    if(entry[2] > 0):
+                        summaries.append(entry)
+        return summaries
@@ -0,0 +1,198 @@
+import io
+import os
+import csv
+import sys
+import gzip
+import json
+import time
+import heapq
+import bisect
+import argparse
+import fnmatch
+from Logger.Logger import LOG_DIRECTORY
+
+LOG_INDEX_STRIDE = 64 * 1024 # bytes of log between two index entries
+LOG_QUERY_SLACK = 5 # seconds records may be out of order within a file
+LOG_QUERY_PATTERNS = ["mcsp_*.log", "mcsp_*.log.gz"]
+LOG_QUERY_ERROR_PATTERNS = ["errors_*.log", "errors_*.log.gz"]
+
+"""
+Time window queries over the text logs (rows of time.time(), message).
+A sparse index of (timestamp, byte offset) pairs is stored next to every log as
+hidden .<name>.idx file, it is built on the first query and extended on later ones.
+"""
+
+class LogIndex():
+    def __init__(self, path : str):
+        self.path = path
+        self.indexPath = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".idx")
+        self.compressed = path.endswith(".gz")
+        self.inode = None
+        self.size = 0
+        self.first = None
+        self.last = None
+        self.times = []
+        self.offsets = []
+        self.openRecord = False
+
+    def open(path : str):
+        index = LogIndex(path)
+        index.load()
+        index.update()
+        return index
+
+    def load(self):
+        try:
+            with open(self.indexPath, mode='r') as file:
+                data = json.load(file)
+            self.inode = data["inode"]
+            self.size = data["size"]
+            self.first = data["first"]
+            self.last = data["last"]
+            self.times = data["times"]
+            self.offsets = data["offsets"]
+            self.openRecord = data["open"]
+        except (OSError, ValueError, KeyError):
+            self.__init__(self.path)
+
+    def save(self):
+        data = {"inode" : self.inode, "size" : self.size, "first" : self.first, "last" : self.last,
+                "times" : self.times, "offsets" : self.offsets, "open" : self.openRecord}
+        tmpPath = self.indexPath + ".tmp"
+        try:
+            with open(tmpPath, mode='w') as file:
+                json.dump(data, file)
+            os.replace(tmpPath, self.indexPath)
+        except OSError:
+            # read only copies (e.g. the usb backup) are queried without persisting the index
+            pass
+
+    def update(self):
+        stat = os.stat(self.path)
+        # a rotated log gets a new inode at the same path and has to be indexed again
+        if(stat.st_ino != self.inode or stat.st_size < self.size):
+            self.__init__(self.path)
+            self.inode = stat.st_ino
+
+        if(stat.st_size == self.size or (self.compressed and self.size > 0)):
+            return
+
+        if(self.compressed):
+            with gzip.open(self.path, mode='rb') as file:
+                self._scan(file, 0)
+            self.size = stat.st_size
+        else:
+            with open(self.path, mode='rb') as file:
+                file.seek(self.size)
+                self.size = self._scan(file, self.size)
+
+        self.save()
+
+    def _scan(self, file, offset : int):
+        """ indexes the complete lines of file starting at offset, returns the offset after the last one """
+        # a quoted message may span several lines, a record only starts after an even number of quotes
+        lastEntry = self.offsets[-1] if len(self.offsets) > 0 else -LOG_INDEX_STRIDE
+        for line in file:
+            if(not line.endswith(b'\n')):
+                # the writer is still in the middle of this line
+                break
+            if(not self.openRecord):
+                t = LogIndex._parseTime(line)
+                if(t != None):
+                    if(self.first == None):
+                        self.first = t
+                    self.last = t if self.last == None else max(self.last, t)
+                    if(not self.compressed and offset - lastEntry >= LOG_INDEX_STRIDE):
+                        self.times.append(t)
+                        self.offsets.append(offset)
+                        lastEntry = offset
+            if(line.count(b'"') % 2 == 1):
+                self.openRecord = not self.openRecord
+            offset += len(line)
+        return offset
+
+    def _parseTime(line : bytes):
+        try:
+            return float(line[:line.index(b',')])
+        except ValueError:
+            return None
+
+    def overlaps(self, start : float, end : float):
+        return self.first != None and self.first <= end + LOG_QUERY_SLACK and self.last >= start - LOG_QUERY_SLACK
+
+    def offsetBefore(self, t : float):
+        pos = bisect.bisect_right(self.times, t - LOG_QUERY_SLACK) - 1
+        return self.offsets[pos] if pos >= 0 else 0
+
+    def read(self, start : float, end : float):
+        """ yields (time, path, message) of the records with start <= time <= end """
+        if(not self.overlaps(start, end)):
+            return
+
+        if(self.compressed):
+            raw = gzip.open(self.path, mode='rb')
+        else:
+            raw = open(self.path, mode='rb')
+            raw.seek(self.offsetBefore(start))
+
+        with io.TextIOWrapper(raw, encoding='utf-8', errors='replace', newline='') as file:
+            for row in csv.reader(file, delimiter=','):
+                try:
+                    t = float(row[0])
+                except (ValueError, IndexError):
+                    continue
+                if(t > end + LOG_QUERY_SLACK and not self.compressed):
+                    break
+                if(start <= t <= end):
+                    yield (t, self.path, row[1] if len(row) > 1 else "")
+
+
+def findLogs(directory : str, patterns : 'list[str]'):
+    files = [f for f in os.listdir(directory) if any(fnmatch.fnmatch(f, p) for p in patterns)]
+    return [os.path.join(directory, f) for f in sorted(files)]
+
+def pruneIndexes(directory : str):
+    """ removes the indexes of logs that are gone, e.g. segments replaced by their .gz archive """
+    for f in os.listdir(directory):
+        if(f.startswith(".") and f.endswith(".idx") and not os.path.exists(os.path.join(directory, f[1:-4]))):
+            try:
+                os.remove(os.path.join(directory, f))
+            except OSError as e:
+                print("[-] Error removing log index {} - {}".format(f, e))
+
+def query(start : float, end : float, directory = LOG_DIRECTORY, patterns = LOG_QUERY_PATTERNS, contains = None):
+    """ yields (time, path, message) of all logs in directory in time order """
+    # indexes are only written by queries, so pruning them here keeps their number bounded
+    pruneIndexes(directory)
+    readers = []
+    for path in findLogs(directory, patterns):
+        try:
+            readers.append(LogIndex.open(path).read(start, end))
+        except OSError as e:
+            print("[-] Error indexing log {} - {}".format(path, e))
+
+    for record in heapq.merge(*readers, key=lambda r: r[0]):
+        if(contains == None or contains in record[2]):
+            yield record
+
+def parseTime(value : str):
+    try:
+        return float(value)
+    except ValueError:
+        return time.mktime(time.strptime(value, "%Y-%m-%d %H:%M:%S"))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Print the log records of a time window from all loggers in time order")
+    parser.add_argument("start", help="unix time or 'YYYY-mm-dd HH:MM:SS'")
+    parser.add_argument("end", help="unix time or 'YYYY-mm-dd HH:MM:SS'")
+    parser.add_argument("--dir", default=LOG_DIRECTORY, help="log directory")
+    parser.add_argument("--errors", action="store_true", help="query the error logs instead of the main logs")
+    parser.add_argument("--contains", default=None, help="only print records containing this text")
+    args = parser.parse_args(argv)
+
+    patterns = LOG_QUERY_ERROR_PATTERNS if args.errors else LOG_QUERY_PATTERNS
+    for t, path, message in query(parseTime(args.start), parseTime(args.end), args.dir, patterns, args.contains):
+        print("{:.3f} {} {}".format(t, os.path.basename(path), message))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import threading
+
+LOG_RING_SIZE = 256 # records kept in memory per log level
+
+""" Fixed size in memory buffer of the latest log records, records are (time, logger name, msg, e, args) """
+
+class LogRingBuffer():
+    def __init__(self, size = LOG_RING_SIZE):
+        self.size = size
+        self.records = [None] * size
+        self.pos = 0
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def append(self, record : tuple):
+        with self.lock:
+            self.records[self.pos] = record
+            self.pos = (self.pos + 1) % self.size
+            self.total += 1
+
+    def getRecent(self, n = None):
+        """ returns up to n of the latest records, oldest first """
+        with self.lock:
+            count = min(self.total, self.size)
+            if(n != None):
+                count = min(count, n)
+            start = self.pos - count
+            if(start >= 0):
+                return self.records[start:self.pos]
+            return self.records[start:] + self.records[:self.pos]
+
+    def countSince(self, t : float):
+        """ number of buffered records newer than t, limited by the size of the buffer """
+        count = 0
+        for record in reversed(self.getRecent()):
+            if(record[0] < t):
+                break
+            count += 1
+        return count
+
+    def getTotal(self):
+        return self.total
@@ -0,0 +1,131 @@
+import os
+import csv
+import gzip
+import time
+import queue
+import shutil
+import threading
+from Logger.LogWriter import LogFile
+
+LOG_MAX_BYTES = 4 * 1024 * 1024 # size of a text log before it is rotated
+LOG_MAX_SECONDS = 24 * 60 * 60 # age of a text log before it is rotated
+LOG_COMPRESS = True # gzip completed segments in the background
+LOG_COMPRESS_NICE = 19 # niceness of the compression thread
+LOG_ROTATE_RETRY_SECONDS = 60 # wait after a failed rotation before trying again
+
+"""
+Text logs keep their path while being written, completed segments are renamed to
+<name>.<segment>.log and compressed to <name>.<segment>.log.gz in the background
+"""
+
+class RotatingLogFile(LogFile):
+    def __init__(self, path : str, buffering = -1, maxBytes = None, maxSeconds = None):
+        super().__init__(path, buffering)
+        self.buffering = buffering
+        self.maxBytes = maxBytes if maxBytes != None else LOG_MAX_BYTES
+        self.maxSeconds = maxSeconds if maxSeconds != None else LOG_MAX_SECONDS
+        self.segment = 0
+        self.opened = time.time()
+        self.rotateFailed = None
+
+    def flush(self):
+        super().flush()
+        self.rotateIfNeeded()
+
+    def close(self):
+        try:
+            LogFile.flush(self)
+        finally:
+            self._closeHandle()
+
+    def rotateIfNeeded(self):
+        if(self.rotateFailed != None and time.time() - self.rotateFailed < LOG_ROTATE_RETRY_SECONDS):
+            return
+        size = self.getSize()
+        if(size >= self.maxBytes or (size > 0 and time.time() - self.opened >= self.maxSeconds)):
+            self.rotate()
+
+    def rotate(self):
+        segmentPath = None
+        try:
+            self._closeHandle()
+            segmentPath = self.nextSegmentPath()
+            os.rename(self.path, segmentPath)
+            self.rotateFailed = None
+        except Exception as e:
+            print("[-] Error rotating log {}, it continues unrotated - {}".format(self.path, e))
+            segmentPath = None
+            self.rotateFailed = time.time()
+        finally:
+            # the log always continues on its original path, whether the rename worked or not
+            self._reopen()
+
+        if(segmentPath == None):
+            return
+        self.opened = time.time()
+
+        if(LOG_COMPRESS):
+            LogCompressor.getInstance().compress(segmentPath)
+
+    def _reopen(self):
+        try:
+            super().__init__(self.path, self.buffering)
+        except Exception as e:
+            print("[-] Error reopening log {}, writing it without staging - {}".format(self.path, e))
+            self.stagedPath = self.path
+            self.file = open(self.path, mode='a', newline='', buffering=self.buffering)
+            self.writer = csv.writer(self.file, delimiter=',')
+            self.dirty = False
+
+    def nextSegmentPath(self):
+        base = self.path[:-4] if self.path.endswith(".log") else self.path
+        while True:
+            self.segment += 1
+            segmentPath = "{}.{:03d}.log".format(base, self.segment)
+            if(not os.path.exists(segmentPath) and not os.path.exists(segmentPath + ".gz")):
+                return segmentPath
+
+
+class LogCompressor():
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._compressLoop, name="LogCompressor", daemon=True)
+        self.thread.start()
+
+    def getInstance():
+        if(LogCompressor._instance == None):
+            with LogCompressor._instance_lock:
+                if(LogCompressor._instance == None):
+                    LogCompressor._instance = LogCompressor()
+        return LogCompressor._instance
+
+    def compress(self, path : str):
+        self.queue.put(path)
+
+    def getQueueLength(self):
+        return self.queue.qsize()
+
+    def _compressLoop(self):
+        # on linux the niceness only applies to the calling thread
+        try:
+            os.nice(LOG_COMPRESS_NICE)
+        except Exception as e:
+            print("[-] Unable to lower priority of log compression - {}".format(e))
+
+        while True:
+            path = self.queue.get()
+            try:
+                LogCompressor.compressFile(path)
+            except Exception as e:
+                print("[-] Error compressing log segment {} - {}".format(path, e))
+
+    def compressFile(path : str):
+        tmpPath = path + ".gz.tmp"
+        with open(path, mode='rb') as src, gzip.open(tmpPath, mode='wb') as dst:
+            shutil.copyfileobj(src, dst)
+        # the segment is only removed once the complete archive exists
+        os.replace(tmpPath, path + ".gz")
+        os.remove(path)
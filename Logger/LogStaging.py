@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import threading
+
+LOG_STAGING_DIRECTORY = None # e.g. "/dev/shm/warr/" to write logs to RAM first, None writes to the SD card directly
+LOG_STAGING_FLUSH_SECONDS = 60 # interval staged logs are moved to the SD card
+LOG_STAGING_CHUNK = 1024 * 1024 # bytes per read/write while moving a staged log
+LOG_STAGING_STATE_FILE = "log_staging.state"
+
+"""
+RAM staging tier for the log files. Log files are opened in LOG_STAGING_DIRECTORY under
+their file name and the LogWriter thread appends their content to the real path every
+LOG_STAGING_FLUSH_SECONDS, when the sensor sink syncs (error records) and at shutdown.
+After every move the time is stored in LOG_STAGING_STATE_FILE next to the logs, so after
+a power loss everything logged after that time has to be considered lost.
+"""
+
+class LogStaging():
+    _files = {} # staged path -> real path
+    _lock = threading.Lock()
+    _last_flush = time.monotonic()
+
+    def isEnabled():
+        return LOG_STAGING_DIRECTORY != None
+
+    def getStagingPath(path : str):
+        """ path the log is written to, path itself if staging is disabled """
+        if(not LogStaging.isEnabled()):
+            return path
+        return os.path.join(LOG_STAGING_DIRECTORY, os.path.basename(path))
+
+    def register(stagedPath : str, path : str):
+        if(stagedPath != path):
+            os.makedirs(LOG_STAGING_DIRECTORY, exist_ok=True)
+            with LogStaging._lock:
+                LogStaging._files[stagedPath] = path
+
+    def release(stagedPath : str):
+        with LogStaging._lock:
+            LogStaging._files.pop(stagedPath, None)
+
+    def moveToTarget(stagedPath : str, path : str):
+        """ appends the staged bytes to path in large chunks, syncs it and empties the staged file """
+        moved = 0
+        with open(stagedPath, mode='rb') as src:
+            chunk = src.read(LOG_STAGING_CHUNK)
+            if(len(chunk) == 0):
+                return 0
+            with open(path, mode='ab') as dst:
+                while len(chunk) > 0:
+                    dst.write(chunk)
+                    moved += len(chunk)
+                    chunk = src.read(LOG_STAGING_CHUNK)
+                dst.flush()
+                os.fsync(dst.fileno())
+        # the log files are opened in append mode, so they continue at the start of the emptied file
+        os.truncate(stagedPath, 0)
+        return moved
+
+    def tick():
+        if(len(LogStaging._files) > 0 and time.monotonic() - LogStaging._last_flush >= LOG_STAGING_FLUSH_SECONDS):
+            LogStaging.flushAll()
+
+    def flushAll():
+        """ moves all staged logs to the SD card, only called from the LogWriter thread """
+        LogStaging._last_flush = time.monotonic()
+        with LogStaging._lock:
+            files = list(LogStaging._files.items())
+
+        directories = set()
+        for stagedPath, path in files:
+            try:
+                LogStaging.moveToTarget(stagedPath, path)
+                directories.add(os.path.dirname(path))
+            except Exception as e:
+                print("[-] Error moving staged log {} - {}".format(stagedPath, e))
+
+        for directory in directories:
+            LogStaging._writeState(directory)
+
+    def recover(directory : str):
+        """ moves logs left in the staging directory by a previous run to directory, returns the time of its last flush or None """
+        if(LogStaging.isEnabled() and os.path.isdir(LOG_STAGING_DIRECTORY)):
+            with LogStaging._lock:
+                owned = set(LogStaging._files.keys())
+            for f in os.listdir(LOG_STAGING_DIRECTORY):
+                stagedPath = os.path.join(LOG_STAGING_DIRECTORY, f)
+                if(stagedPath in owned or not os.path.isfile(stagedPath)):
+                    continue
+                try:
+                    LogStaging.moveToTarget(stagedPath, os.path.join(directory, f))
+                    os.remove(stagedPath)
+                except Exception as e:
+                    print("[-] Error recovering staged log {} - {}".format(stagedPath, e))
+
+        return LogStaging.getLastFlush(directory)
+
+    def getLastFlush(directory : str):
+        try:
+            with open(os.path.join(directory, LOG_STAGING_STATE_FILE), mode='r') as file:
+                return json.load(file)["last_flush"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _writeState(directory : str):
+        path = os.path.join(directory, LOG_STAGING_STATE_FILE)
+        tmpPath = path + ".tmp"
+        try:
+            with open(tmpPath, mode='w') as file:
+                json.dump({"last_flush" : time.time(), "flush_interval" : LOG_STAGING_FLUSH_SECONDS}, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmpPath, path)
+        except Exception as e:
+            print("[-] Error writing log staging state {} - {}".format(path, e))
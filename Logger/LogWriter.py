@@ -0,0 +1,192 @@
+import csv
+import os
+import time
+import queue
+import threading
+import atexit
+from Logger.LogStaging import LogStaging
+
+LOG_QUEUE_SIZE = 10_000 # pending log jobs before new ones are dropped
+LOG_IDLE_TICK = 1 # seconds the writer waits for work before flushing
+
+""" Single background thread that performs all log file I/O of the process """
+
+class LogFile():
+    """ Append handle of one log file, kept open for the lifetime of the writer """
+
+    def __init__(self, path : str, buffering = -1, binary = False):
+        self.path = path
+        self.stagedPath = LogStaging.getStagingPath(path)
+        LogStaging.register(self.stagedPath, path)
+        if(binary):
+            self.file = open(self.stagedPath, mode='ab', buffering=buffering)
+            self.writer = None
+        else:
+            self.file = open(self.stagedPath, mode='a', newline='', buffering=buffering)
+            self.writer = csv.writer(self.file, delimiter=',')
+        self.dirty = False
+
+    def isStaged(self):
+        return self.stagedPath != self.path
+
+    def writeRow(self, row : list):
+        self.writer.writerow(row)
+        self.dirty = True
+
+    def flush(self):
+        if(self.dirty):
+            self.file.flush()
+            self.dirty = False
+
+    def sync(self):
+        """ flushes and forces the data onto the storage device """
+        self.file.flush()
+        if(self.isStaged()):
+            LogStaging.moveToTarget(self.stagedPath, self.path)
+        else:
+            os.fsync(self.file.fileno())
+        self.dirty = False
+
+    def getSize(self):
+        size = os.fstat(self.file.fileno()).st_size
+        if(self.isStaged() and os.path.isfile(self.path)):
+            size += os.path.getsize(self.path)
+        return size
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._closeHandle()
+
+    def _closeHandle(self):
+        self.file.close()
+        if(self.isStaged()):
+            LogStaging.moveToTarget(self.stagedPath, self.path)
+            os.remove(self.stagedPath)
+            LogStaging.release(self.stagedPath)
+
+
+class LogWriter():
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, maxQueueSize = LOG_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=maxQueueSize)
+        self.files = {}
+        self.tickHooks = []
+        self.flushHooks = []
+        self.dropped = 0
+        self.running = True
+        self.addTickHook(LogStaging.tick)
+        self.thread = threading.Thread(target=self._writeLoop, name="LogWriter", daemon=True)
+        self.thread.start()
+
+    def getInstance():
+        if(LogWriter._instance == None):
+            with LogWriter._instance_lock:
+                if(LogWriter._instance == None):
+                    LogWriter._instance = LogWriter()
+                    atexit.register(LogWriter._instance.close)
+        return LogWriter._instance
+
+    def submit(self, func, *args):
+        # never block the caller: hot loops must not wait for the SD card
+        try:
+            self.queue.put_nowait((func, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def getFile(self, path : str, fileType = LogFile):
+        # only called from the writer thread, so no locking needed
+        logFile = self.files.get(path)
+        if(logFile == None):
+            logFile = fileType(path)
+            self.files[path] = logFile
+        return logFile
+
+    def addTickHook(self, func):
+        """ func is called on the writer thread about every LOG_IDLE_TICK seconds """
+        self.tickHooks.append(func)
+
+    def addFlushHook(self, func):
+        """ func is called on the writer thread on flush() and before shutdown """
+        self.flushHooks.append(func)
+
+    def getDroppedCount(self):
+        return self.dropped
+
+    def getQueueLength(self):
+        return self.queue.qsize()
+
+    def flush(self, timeout = 5):
+        """ blocks until every job submitted before the call has been written """
+        if(threading.current_thread() is self.thread):
+            self._flushAll()
+            return True
+        done = threading.Event()
+        self.queue.put((self._flushAndSignal, (done,)), timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout = 5):
+        if(self.running):
+            self.flush(timeout)
+            self.running = False
+            self.thread.join(timeout)
+
+    def _writeLoop(self):
+        lastTick = time.monotonic()
+        while self.running or not self.queue.empty():
+            try:
+                func, args = self.queue.get(timeout=LOG_IDLE_TICK)
+
+                try:
+                    func(*args)
+                except Exception as e:
+                    print("[-] Error in log writer job {} - {}".format(func, e))
+
+                # group commit: push buffered rows to the OS once the backlog is drained
+                if(self.queue.empty()):
+                    self._flushFiles()
+            except queue.Empty:
+                pass
+
+            if(time.monotonic() - lastTick >= LOG_IDLE_TICK):
+                lastTick = time.monotonic()
+                self._runHooks(self.tickHooks)
+
+        self._runHooks(self.flushHooks)
+        for logFile in self.files.values():
+            try:
+                logFile.close()
+            except Exception as e:
+                print("[-] Error closing log file {} - {}".format(logFile.path, e))
+        self.files = {}
+        # logs still open in other sinks are moved from the staging tier without closing them
+        LogStaging.flushAll()
+
+    def _flushAll(self):
+        self._flushFiles()
+        self._runHooks(self.flushHooks)
+        if(LogStaging.isEnabled()):
+            LogStaging.flushAll()
+
+    def _flushAndSignal(self, done : threading.Event):
+        self._flushAll()
+        done.set()
+
+    def _runHooks(self, hooks):
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print("[-] Error in log writer hook {} - {}".format(hook, e))
+
+    def _flushFiles(self):
+        for logFile in self.files.values():
+            try:
+                logFile.flush()
+            except Exception as e:
+                print("[-] Error flushing log file {} - {}".format(logFile.path, e))
@@ -1,12 +1,26 @@
-import csv
+import os
+import sys
 import time
-import threading
 import abc
+import threading
 import traceback
+from Logger.LogWriter import LogWriter
+from Logger.SensorSink import SensorSink
+from Logger.LogRotation import RotatingLogFile
+from Logger.LogRingBuffer import LogRingBuffer
+from Logger.ErrorFloodFilter import ErrorFloodFilter
 
 WRITE = True
 PRINT = False
 LOG_DIRECTORY = "/home/warr/"
+BINARY_SENSOR_DATA = False # numeric sensor data as binary .bin files (see Logger.BinaryLogReader)
+
+# Log levels
+DEBUG = 10
+INFO = 20
+ERROR = 40
+
+LOG_LEVEL = DEBUG # global minimum level, INFO drops the per cycle chatter of the control loops
 
 # Normal Time + seperate Error File
 
@@ -23,98 +37,260 @@ class LoggedSensorObject(metaclass=abc.ABCMeta):
 
 class Logger():
     _error_counter = 0
+    _error_lock = threading.Lock()
+    _flood_filter = None
     _error_file = ""
+    _sensor_sink = None
+    _time_cache = (None, "")
+    _registry = {}
+    _registry_lock = threading.Lock()
+    _recent = {DEBUG : LogRingBuffer(), INFO : LogRingBuffer(), ERROR : LogRingBuffer()}
 
-    def __init__(self, name : str, LOG = True):
+    def __init__(self, name : str, LOG = True, level = None):
         self.name = name
         self.LOG = LOG
+        self.level = level
         self.mainFile = LOG_DIRECTORY + "mcsp_" + name.replace(" ","") + "_" + str(int(time.time() * 100)) + ".log"
         self.files = {}
 
         if(Logger._error_file == ""):
             Logger._error_file = LOG_DIRECTORY + "errors_" + str(int(time.time() * 100)) + ".log"
- 
-    def logErr(self, msg:str, e:Exception = None):
-        threading.Thread(target=self._logErr,args=(msg,e)).start()
 
-    def logInfo(self, msg:str, e:Exception = None):
-        threading.Thread(target=self._logInfo,args=(msg,e)).start()
+    def get(name : str, LOG = True):
+        """ returns the shared logger of name, use it instead of Logger(name) on hot paths """
+        logger = Logger._registry.get(name)
+        if(logger == None):
+            with Logger._registry_lock:
+                logger = Logger._registry.get(name)
+                if(logger == None):
+                    logger = Logger(name, LOG)
+                    Logger._registry[name] = logger
+        return logger
+
+    def setLevel(self, level):
+        """ level of this logger, None falls back to LOG_LEVEL """
+        self.level = level
+
+    def isEnabledFor(self, level):
+        return level >= LOG_LEVEL and (self.level == None or level >= self.level)
+
+    # msg is only formatted with msg.format(*args) if the record is emitted, so callers
+    # on hot paths should pass their values as args instead of formatting them up front
+    def logErr(self, msg:str, e:Exception = None, args:tuple = ()):
+        # every error is counted, even if it is filtered or coalesced
+        with Logger._error_lock:
+            Logger._error_counter += 1
+
+        if(self.isEnabledFor(ERROR)):
+            t = time.time()
+            Logger._recent[ERROR].append((t, self.name, msg, Logger._errorText(e), args))
+
+            write, summary = Logger._getFloodFilter().accept(self, t, msg, e, args)
+            if(summary != None):
+                LogWriter.getInstance().submit(Logger._logSuppressed, summary)
+            if(write):
+                LogWriter.getInstance().submit(self._logErr, t, msg, e, args)
+
+    def logInfo(self, msg:str, e:Exception = None, args:tuple = ()):
+        if(self.isEnabledFor(INFO)):
+            t = time.time()
+            Logger._recent[INFO].append((t, self.name, msg, Logger._errorText(e), args))
+            LogWriter.getInstance().submit(self._logInfo, t, msg, e, args)
+
+    def logDebug(self, msg:str, e:Exception = None, args:tuple = ()):
+        if(self.isEnabledFor(DEBUG)):
+            t = time.time()
+            Logger._recent[DEBUG].append((t, self.name, msg, Logger._errorText(e), args))
+            LogWriter.getInstance().submit(self._logDebug, t, msg, e, args)
 
     def logSensorData(self, sensorName:str, data:dict):
-        threading.Thread(target=self._logSensorData,args=(sensorName, data)).start()
+        LogWriter.getInstance().submit(self._logSensorData, sensorName, data, time.time())
 
 
-    def _logErr(self, msg:str, e:Exception = None):
+    def _logErr(self, t:float, msg:str, e:Exception = None, args:tuple = ()):
         try:
+            str_msg = self._formatRecord("[-]", t, msg, e, args)
             if(PRINT):
-                str_msg = ""
-                if(e == None):
-                    str_msg = "[-] <{t}> {name} : {msg}".format(t=time.strftime("%d-%m-%Y %H:%M:%S"), name = self.name, msg = msg)
-                else:
-                    str_msg = "[-] <{t}> {name} : {msg} - {emsg}".format(t=time.strftime("%d-%m-%Y %H:%M:%S"), name = self.name, msg = msg,emsg = e)
-                if(PRINT):
-                    print(str_msg)
+                print(str_msg)
             if(WRITE):
-                self._writeTextLogFile(str_msg)
-                self._writeTextLogFile(str_msg, file = Logger._error_file)
-            Logger._error_counter += 1
+                self._writeTextLogFile(str_msg, t = t)
+                self._writeTextLogFile(str_msg, file = Logger._error_file, t = t)
+
+            # make sure the sensor data leading up to the error survives a power loss
+            if(Logger._sensor_sink != None):
+                Logger._sensor_sink.flush()
 
-                    
         except Exception as e:
             pass
 
-    def _logInfo(self, msg:str, e:Exception = None):
+    def _logSuppressed(entry : list):
+        logger, start, count, msg, e, args = entry
+        t = time.time()
+        str_msg = logger._formatRecord("[-]", t, msg + " (repeated {} more times in {:.0f}s)".format(count, t - start), e, args)
+        if(PRINT):
+            print(str_msg)
+        if(WRITE):
+            logger._writeTextLogFile(str_msg, t = t)
+            logger._writeTextLogFile(str_msg, file = Logger._error_file, t = t)
+
+    def _flushSuppressed(all = False):
+        for entry in Logger._flood_filter.collectExpired(time.time(), all):
+            Logger._logSuppressed(entry)
+
+    def _getFloodFilter():
+        if(Logger._flood_filter == None):
+            with Logger._error_lock:
+                if(Logger._flood_filter == None):
+                    # assigned before the hooks exist, the writer thread may tick right after addTickHook
+                    Logger._flood_filter = ErrorFloodFilter()
+                    writer = LogWriter.getInstance()
+                    writer.addTickHook(Logger._flushSuppressed)
+                    writer.addFlushHook(lambda: Logger._flushSuppressed(all = True))
+        return Logger._flood_filter
+
+    def _logInfo(self, t:float, msg:str, e:Exception = None, args:tuple = ()):
+        self._logText("[i]", t, msg, e, args)
+
+    def _logDebug(self, t:float, msg:str, e:Exception = None, args:tuple = ()):
+        self._logText("[d]", t, msg, e, args)
+
+    def _logText(self, prefix:str, t:float, msg:str, e:Exception = None, args:tuple = ()):
         try:
-            str_msg = ""
-            if(e == None):
-                str_msg = "[i] <{t}> {name} : {msg}".format(t=time.strftime("%d-%m-%Y %H:%M:%S"), name = self.name, msg = msg)
-            else:
-                str_msg = "[i] <{t}> {name} : {msg} - {emsg}".format(t=time.strftime("%d-%m-%Y %H:%M:%S"), name = self.name, msg = msg,emsg = e)
+            str_msg = self._formatRecord(prefix, t, msg, e, args)
             if(self.LOG and PRINT):
                 print(str_msg)
             if(WRITE):
-                self._writeTextLogFile(str_msg)
+                self._writeTextLogFile(str_msg, t = t)
 
         except Exception as e:
             pass
+
+    def _formatRecord(self, prefix:str, t:float, msg:str, e:Exception = None, args:tuple = ()):
+        if(len(args) > 0):
+            msg = msg.format(*args)
+        if(e == None):
+            return "{p} <{t}> {name} : {msg}".format(p = prefix, t = Logger._formatTime(t), name = self.name, msg = msg)
+        else:
+            return "{p} <{t}> {name} : {msg} - {emsg}".format(p = prefix, t = Logger._formatTime(t), name = self.name, msg = msg, emsg = e)
+
+    def _formatTime(t:float):
+        # records arrive in bursts within the same second, so strftime is cached per second
+        second = int(t)
+        if(Logger._time_cache[0] != second):
+            Logger._time_cache = (second, time.strftime("%d-%m-%Y %H:%M:%S", time.localtime(second)))
+        return Logger._time_cache[1]
     
-    def _logSensorData(self, sensorName:str, data:dict):
+    def _logSensorData(self, sensorName:str, data:dict, t:float = None):
         if(not sensorName in self.files.keys()):
-            self.files[sensorName] = LOG_DIRECTORY + sensorName + str(int(time.time())) + ".log"
+            self.files[sensorName] = LOG_DIRECTORY + sensorName + str(int(time.time()))
         if(WRITE):
-            self._writeDataCSV(data,self.files[sensorName])       
+            if(BINARY_SENSOR_DATA and self._writeDataBinary(data, self.files[sensorName] + ".bin", t)):
+                return
+            self._writeDataCSV(data,self.files[sensorName] + ".log", t)
+
+    def _writeDataBinary(self, data:dict, LOG_FILE:str, t:float = None):
+        try:
+            return Logger._getSensorSink().writeBinary(LOG_FILE, t if t != None else time.time(), data)
+        except Exception as e:
+            self.logErr("Error writing Data to binary File (data: {}, file: {})".format(data, LOG_FILE),e)
+            return False
 
-    def _writeDataCSV(self, data:dict ,LOG_FILE:str):
+    def _writeDataCSV(self, data:dict ,LOG_FILE:str, t:float = None):
         if(WRITE):
             try:
-                dataList = [time.time()]
+                dataList = [t if t != None else time.time()]
                 for k in data.keys():
                     dataList.append(k)
                     dataList.append(data[k])
 
-                with open(LOG_FILE, mode='a') as csv_file:
-                    writer = csv.writer(csv_file, delimiter=',')
-                    writer.writerow(dataList)
+                Logger._getSensorSink().writeRow(LOG_FILE, dataList)
             except Exception as e:
                 self.logErr("Error writing Data to CSV File (data: {}, file: {})".format(data, LOG_FILE),e)
         else:
             self.logErr("writeDataCSV is called, but WRITE is not activated ")
     
-    def _writeTextLogFile(self,string:str, file = None):
+    def _writeTextLogFile(self,string:str, file = None, t = None):
         if(file == None):
             file = self.mainFile
+        if(t == None):
+            t = time.time()
         if(WRITE):
             try:
-                with open(file, mode='a') as csv_file:
-                    writer = csv.writer(csv_file, delimiter=',')
-                    writer.writerow([time.time(), string])
+                LogWriter.getInstance().getFile(file, RotatingLogFile).writeRow([t, string])
             except Exception as e:
                 print("[-] Error writing to text log file {} - {}".format(string,e))
         else:
             self.logErr("writeTextLogFile is called, but WRITE is not activated ")
     
+    def _getSensorSink():
+        if(Logger._sensor_sink == None):
+            Logger._sensor_sink = SensorSink()
+            writer = LogWriter.getInstance()
+            writer.addTickHook(Logger._sensor_sink.tick)
+            writer.addFlushHook(Logger._sensor_sink.flush)
+        return Logger._sensor_sink
+
     def getErrorCount():
         return Logger._error_counter
+
+    def _errorText(e:Exception):
+        # records kept in memory only hold the text, the exception would keep its frames and their locals alive
+        return None if e == None else str(e)
+
+    def getRecentRecords(level, n = None):
+        """ latest (time, logger name, msg, error text, args) records of level from memory, oldest first """
+        return Logger._recent[level].getRecent(n)
+
+    def countRecentErrors(seconds : float):
+        return Logger._recent[ERROR].countSince(time.time() - seconds)
+
+    def dumpRecentRecords(path = None):
+        """ writes the in memory records of all levels in time order to path, replacing it atomically """
+        if(path == None):
+            path = LOG_DIRECTORY + "crash_" + str(int(time.time() * 100)) + ".log"
+
+        prefixes = {DEBUG : "[d]", INFO : "[i]", ERROR : "[-]"}
+        records = [(r, level) for level in Logger._recent.keys() for r in Logger._recent[level].getRecent()]
+        records.sort(key=lambda r: r[0][0])
+
+        tmpPath = path + ".tmp"
+        with open(tmpPath, mode='w') as file:
+            for (t, name, msg, e, args), level in records:
+                try:
+                    text = msg.format(*args) if len(args) > 0 else msg
+                except Exception:
+                    text = "{} {}".format(msg, args)
+                if(e != None):
+                    text = "{} - {}".format(text, e)
+                file.write("{},{} <{}> {} : {}\n".format(t, prefixes[level], Logger._formatTime(t), name, text))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmpPath, path)
+        return path
+
+    def installCrashHandler():
+        """ dumps the in memory records when an exception is not handled by the main or any other thread """
+        previousHook = sys.excepthook
+        previousThreadHook = threading.excepthook
+
+        def dump(excType, excValue, excTraceback, threadName):
+            try:
+                Logger.get("Crash Handler").logErr("Unhandled exception in thread {}: {}", args=(threadName, "".join(traceback.format_exception(excType, excValue, excTraceback))))
+                Logger.dumpRecentRecords()
+            except Exception as e:
+                print("[-] Error dumping recent log records - {}".format(e))
+
+        def excepthook(excType, excValue, excTraceback):
+            dump(excType, excValue, excTraceback, threading.current_thread().name)
+            previousHook(excType, excValue, excTraceback)
+
+        def threadExcepthook(hookArgs):
+            threadName = hookArgs.thread.name if hookArgs.thread != None else "unknown"
+            dump(hookArgs.exc_type, hookArgs.exc_value, hookArgs.exc_traceback, threadName)
+            previousThreadHook(hookArgs)
+
+        sys.excepthook = excepthook
+        threading.excepthook = threadExcepthook
     
 
 
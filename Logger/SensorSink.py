@@ -0,0 +1,80 @@
+import time
+from Logger.LogWriter import LogFile
+from Logger.BinaryLog import BinarySensorFile
+
+SENSOR_FLUSH_ROWS = 500 # rows buffered over all sensors before a flush
+SENSOR_FLUSH_SECONDS = 10 # max. age of a buffered row
+SENSOR_FSYNC = True # force flushed rows onto the SD card
+SENSOR_BUFFER_BYTES = 64 * 1024 # write buffer per sensor file
+
+""" Buffered sink for the sensor data files, only used from the LogWriter thread """
+
+class SensorSink():
+    def __init__(self, flushRows = SENSOR_FLUSH_ROWS, flushSeconds = SENSOR_FLUSH_SECONDS, fsync = SENSOR_FSYNC):
+        self.flushRows = flushRows
+        self.flushSeconds = flushSeconds
+        self.fsync = fsync
+        self.files = {}
+        self.pendingRows = 0
+        self.lastFlush = time.monotonic()
+
+    def writeRow(self, path : str, row : list):
+        logFile = self.files.get(path)
+        if(logFile == None):
+            logFile = LogFile(path, buffering=SENSOR_BUFFER_BYTES)
+            self.files[path] = logFile
+
+        logFile.writeRow(row)
+        self._rowWritten()
+
+    def writeBinary(self, path : str, timestamp : float, data : dict):
+        """ returns False if data can't be stored in the binary file of path """
+        binFile = self.files.get(path)
+        if(binFile == None):
+            fields = BinarySensorFile.schemaFromData(data)
+            if(fields == None):
+                return False
+            # a file left with another schema (e.g. a changed sensor) is continued in a new one
+            binFile = BinarySensorFile.openMatching(path, fields, buffering=SENSOR_BUFFER_BYTES)
+            self.files[path] = binFile
+
+        values = binFile.encode(data)
+        if(values == None):
+            return False
+
+        binFile.writeRecord(timestamp, values)
+        self._rowWritten()
+        return True
+
+    def _rowWritten(self):
+        self.pendingRows += 1
+        if(self.pendingRows >= self.flushRows):
+            self.flush()
+
+    def tick(self):
+        if(self.pendingRows > 0 and time.monotonic() - self.lastFlush >= self.flushSeconds):
+            self.flush()
+
+    def flush(self):
+        for logFile in self.files.values():
+            try:
+                if(not logFile.dirty):
+                    continue
+                if(self.fsync):
+                    logFile.sync()
+                else:
+                    logFile.flush()
+            except Exception as e:
+                print("[-] Error flushing sensor file {} - {}".format(logFile.path, e))
+
+        self.pendingRows = 0
+        self.lastFlush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        for logFile in self.files.values():
+            try:
+                logFile.close()
+            except Exception as e:
+                print("[-] Error closing sensor file {} - {}".format(logFile.path, e))
+        self.files = {}
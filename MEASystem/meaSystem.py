@@ -97,8 +97,8 @@ class MeaSPI(SpidevBus, TelemetryDataSource):
         return process_sample(msb, lsb)
 
     """
-    Attempts to read n_samples*2 bytes from the MEA and outputs them to
-    a list of lists of size chunk_size.
+    Attempts to read n_samples*2 bytes from the MEA into one contiguous uint8
+    buffer, returned as a (n_readouts, chunk_size) view without copying.
     
     The resulting n_samples might differ (be lower) than the supplied
     n_samples if n_samples*2 is not a multiple of chunk_size
@@ -114,22 +114,20 @@ class MeaSPI(SpidevBus, TelemetryDataSource):
         if not (chunk_size % 2 == 0):
             raise Exception('chunk_size expected to be a multiple of 2')
 
-        samples_raw = []
-
         n_readouts = n_samples * 2 // chunk_size
         # n_samples may be changed because supplied n_samples*2 may not be a multiple of chunk_size
         n_samples = int(n_readouts * chunk_size / 2)
 
-        for i in range(0, n_readouts):
-            samples_raw.append(self.read(chunk_size))
+        samples_raw = np.empty(n_readouts * chunk_size, dtype=np.uint8)
+        self.readinto(samples_raw, chunk_size=chunk_size)
 
-        return samples_raw, n_samples
+        return samples_raw.reshape(n_readouts, chunk_size), n_samples
 
     """
     Do a MEA readout and save the results as compressed NPZ file in the format:
     Array: [
         Array[double]: [read_start, read_end],
-        Array[UInt16]: ADC_VALUES
+        Array[UInt8]: ADC_VALUES (raw bytes, n_readouts x chunk_size)
     ]
     
     mea_no ∈ 0:5 (MEAs 1-6)
@@ -159,10 +157,10 @@ class MeaSPI(SpidevBus, TelemetryDataSource):
             super().close()
             time.sleep(0.01)
 
-            payload = np.array([
-                np.array([r_start, r_end], dtype=np.double),
-                np.array(samples_raw, dtype=np.uint16),
-            ], dtype=object)
+            # filled element wise, numpy would otherwise try to broadcast the arrays into one
+            payload = np.empty(2, dtype=object)
+            payload[0] = np.array([r_start, r_end], dtype=np.double)
+            payload[1] = samples_raw
 
             # sn_start = time.time()
             # np.save('samples_raw.npy', payload)
@@ -1,11 +1,16 @@
-import RPi.GPIO as GPIO
+from Bus.Simulation import isSimulated, SimGPIO
+
+if isSimulated():
+    GPIO = SimGPIO
+else:
+    import RPi.GPIO as GPIO
 from time import sleep
 from Logger.Logger import Logger
 from GPIO.gpio import GPIOMapping
 import threading
 from GPIO.gpio import SingleGPIO
-from Bus.I2C import PythonWire
-from Telemetry.Telemetry import TelemetryDataSource,TeleDatatypes
+from Bus.I2C import PythonWire, I2C_PRIORITY_PUMP
+from Telemetry.Telemetry import TelemetryDataSource,TeleDatatypes,TelemetryRegistry
 
 #Pump Constants
 PUMP_PXX_TIME = 7.519 #seconds
@@ -105,6 +110,7 @@ class CustomValve():
         self.pwm = None
         self.power = SingleGPIO(POWER_PIN, CONVERT=CONVERT)
         self.state = False
+        self.teleFields = []
         self.logger = Logger("Custom Valve",LOG)
 
     def setup(self):
@@ -129,6 +135,8 @@ class CustomValve():
             GPIO.setup(self.PWM_PIN, GPIO.OUT)
             self.pwm.ChangeDutyCycle(self.endPoint)
             self.state = True
+            for field in self.teleFields:
+                field.set(self.state)
         except Exception as e:
             self.logger.logErr("Error opening valve", e)
 
@@ -165,7 +173,8 @@ class BartelsPump():
         self.bPumpState = [0, 0, 0, 0]  # boolean
         self.nPumpVoltageByte = [0x00, 0x00, 0x00, 0x00]  # uint_8t
         self.nFrequencyByte = 0x40  # uint8_t
-        self.Wire = PythonWire(I2C_HIGHDRIVER_ADRESS) 
+        self.Wire = PythonWire(I2C_HIGHDRIVER_ADRESS, priority=I2C_PRIORITY_PUMP) 
+        self.teleFields = []
         self.logger = Logger("Bartels Pump")
         self.pumpingLogger = PumpVolumeLogger("Bartels Pump")
         self.setup()
@@ -221,12 +230,18 @@ class BartelsPump():
 
         self.bPumpState[3] = 1
         self.Highdriver_setvoltage(250)
+        self._pushState()
     
     def off(self):
         self.logger.logInfo("Turning Off Bartels Pump")
 
         self.bPumpState[3] = 0
         self.Highdriver_setvoltage(0)   
+        self._pushState()
+
+    def _pushState(self):
+        for field in self.teleFields:
+            field.set(self.bPumpState[3])
     
     def close(self):
         self.Wire.close()
@@ -246,6 +261,7 @@ class PumpVolumeLogger():
         self.logger = Logger("Pump Amount Logger {}".format(self.name))
         self.pumpedAmount = 0
         self.state = False
+        self.teleFields = []
     
     def start(self):
         self.state = True
@@ -261,6 +277,8 @@ class PumpVolumeLogger():
         while(self.state):
             sleep(PUMPING_LOG_RESOLUTION)
             self.pumpedAmount += PUMPING_LOG_RESOLUTION
+            for field in self.teleFields:
+                field.set(self.pumpedAmount)
             self.logger.logSensorData("pumped_amount{}_".format(self.name), {"timesteps" : self.pumpedAmount})
 
 class BetaSystem(TelemetryDataSource):
@@ -307,6 +325,27 @@ class BetaSystem(TelemetryDataSource):
         self.thread = None
         self.mediumChanges = 0
 
+        #telemetry
+        self.teleRegistry = TelemetryRegistry()
+        self.registerTelemetry()
+
+    def registerTelemetry(self):
+        """ registers the telemetry fields, the hardware objects push their changes to them """
+        reg = self.teleRegistry
+        for name, pump in [("p4", self.PUMP_P1B), ("p5", self.PUMP_P2B), ("p6", self.PUMP_P3B), ("p_abeta", self.PUMP_Pu)]:
+            pump.pumpingLogger.teleFields.append(reg.register(name + "_volume", TeleDatatypes.INT, pump.pumpingLogger.pumpedAmount))
+        for name, pump in [("p4", self.PUMP_P1B), ("p5", self.PUMP_P2B), ("p6", self.PUMP_P3B), ("p_abeta", self.PUMP_Pu)]:
+            pump.teleFields.append(reg.register(name + "_status", TeleDatatypes.INT, pump.state))
+
+        self.VALVE_NL.teleFields.append(reg.register("valve1", TeleDatatypes.INT, self.VALVE_NL.state))
+        self.VALVE_V.teleFields.append(reg.register("valve2", TeleDatatypes.INT, self.VALVE_V.state))
+        self.VALVE_V.teleFields.append(reg.register("abeta_status", TeleDatatypes.INT, self.VALVE_V.state))
+
+        self.PUMP_BAR.teleFields.append(reg.register("p_trap_status", TeleDatatypes.INT, self.PUMP_BAR.bPumpState[3]))
+        # amplitude and frequency are only set by Highdriver_init
+        reg.register("p_trap_amp", TeleDatatypes.FLOAT, self.PUMP_BAR.nPumpVoltageByte[3])
+        reg.register("p_trap_freq", TeleDatatypes.FLOAT, self.PUMP_BAR.nFrequencyByte)
+
     def setup(self):
         self.logger.logInfo("Setting up Beta System")
         try:
@@ -454,24 +493,7 @@ class BetaSystem(TelemetryDataSource):
             self.betaReleased = betaReleased
 
     def getTeleData(self):
-        return {"p4_volume" : (self.PUMP_P1B.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-                "p5_volume" : (self.PUMP_P2B.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-                "p6_volume" : (self.PUMP_P3B.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-                "p_abeta_volume": (self.PUMP_Pu.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-
-                "p4_status" : (self.PUMP_P1B.state,TeleDatatypes.INT),
-                "p5_status" : (self.PUMP_P2B.state,TeleDatatypes.INT),
-                "p6_status" : (self.PUMP_P3B.state,TeleDatatypes.INT),
-                "p_abeta_status" : (self.PUMP_Pu.state,TeleDatatypes.INT),
-
-                "valve1" : (self.VALVE_NL.state,TeleDatatypes.INT),
-                "valve2" : (self.VALVE_V.state,TeleDatatypes.INT), 
-
-                "abeta_status" : (self.VALVE_V.state,TeleDatatypes.INT),
-
-                "p_trap_status" : (self.PUMP_BAR.bPumpState[3],TeleDatatypes.INT),
-                "p_trap_amp": (self.PUMP_BAR.nPumpVoltageByte[3],TeleDatatypes.FLOAT),
-                "p_trap_freq" : (self.PUMP_BAR.nFrequencyByte,TeleDatatypes.FLOAT)}
+        return self.teleRegistry.getTeleData()
     
     def selfTest(self):
         logger = Logger("BetaSystem TEST")
@@ -548,6 +570,13 @@ class NONBetaSystem(TelemetryDataSource):
         self.thread = None
         self.setup()
 
+        #telemetry
+        self.teleRegistry = TelemetryRegistry()
+        for n, pump in enumerate([self.PUMP_P1A, self.PUMP_P2A, self.PUMP_P3A]):
+            pump.pumpingLogger.teleFields.append(self.teleRegistry.register("p{}_volume".format(n + 1), TeleDatatypes.INT, pump.pumpingLogger.pumpedAmount))
+        for n, pump in enumerate([self.PUMP_P1A, self.PUMP_P2A, self.PUMP_P3A]):
+            pump.teleFields.append(self.teleRegistry.register("p{}_status".format(n + 1), TeleDatatypes.INT, pump.state))
+
     def _mediumChange(self):
         self.logger.logInfo("Medium Change")
 
@@ -602,12 +631,7 @@ class NONBetaSystem(TelemetryDataSource):
             self.logger.logErr("Error shutting off hardware",e)
 
     def getTeleData(self):
-        return {"p1_volume" : (self.PUMP_P1A.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-                "p2_volume" : (self.PUMP_P2A.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-                "p3_volume" : (self.PUMP_P3A.pumpingLogger.pumpedAmount,TeleDatatypes.INT),
-                "p1_status" : (self.PUMP_P1A.state,TeleDatatypes.INT),
-                "p2_status" : (self.PUMP_P2A.state,TeleDatatypes.INT),
-                "p3_status" : (self.PUMP_P3A.state,TeleDatatypes.INT)}
+        return self.teleRegistry.getTeleData()
 
     def selfTest(self):
         #allow logging on all devices
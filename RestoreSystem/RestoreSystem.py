@@ -1,7 +1,8 @@
 import os
 import pickle
 import time
-from Logger.Logger import Logger
+from Logger.Logger import Logger, LOG_DIRECTORY
+from Logger.LogStaging import LogStaging
 
 # Restore File
 RESTORE_FILE = "/home/warr/restore.config"
@@ -60,6 +61,7 @@ class RestoreSystem():
                                                                                 self.rd.getIssSignalReceived(),
                                                                                 self.rd.getIssSignalReceivedOn(),
                                                                                 self.rd.getNPumpCycles()))
+                self.recoverStagedLogs()
                 return True
             except Exception as e:
                 self.logger.logErr("Error detecting power outage", e)
@@ -71,6 +73,21 @@ class RestoreSystem():
         else:
             return False
 
+    def recoverStagedLogs(self):
+        # logs staged in RAM are lost on a power outage, everything before their last move to the SD card is safe
+        if(LogStaging.isEnabled()):
+            lastFlush = LogStaging.recover(LOG_DIRECTORY)
+            if(lastFlush == None):
+                self.logger.logErr("Staged logs of the previous run were never moved to the SD card")
+            else:
+                self.logger.logErr("Log records after {} ({}) of the previous run may be lost".format(lastFlush, time.ctime(lastFlush)))
+
+    def recoverTelemetry(self, telemetry):
+        # packets spooled to the SD card by the previous run are sent before new ones
+        count = telemetry.replaySpool()
+        if(count > 0):
+            self.logger.logInfo("Requeued {} unsent telemetry packets of the previous run".format(count))
+
     def _saveRestoreInfos(self, restore_file):
         try:
             with open(restore_file, 'wb') as file:
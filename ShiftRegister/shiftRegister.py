@@ -6,7 +6,7 @@ import time
 class BooleanList():
     def __init__(self, data : list = []):
         self.list = list()
-        self.logger = Logger("Boolean List {}".format(time.time()))
+        self.logger = Logger.get("Boolean List")
 
         for d in data:
             if type(d) == bool:
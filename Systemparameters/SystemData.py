@@ -4,7 +4,7 @@ import subprocess
 
 class BashExecution():
     def execute(cmd : str):
-        logger = Logger("BashExecution")
+        logger = Logger.get("BashExecution")
         try:
             (e,s) = subprocess.getstatusoutput(cmd)
             if(e != 0):
@@ -16,6 +16,7 @@ class BashExecution():
 
 
 class SystemParameters(TelemetryDataSource):
+    teleMaxAge = 30 # every refresh runs several shell pipelines, the values change slowly
     def __init__(self):
         self.logger = Logger("System Paramters")
         
@@ -47,7 +48,7 @@ class SystemParameters(TelemetryDataSource):
         try:
             s = self.execute("head -n 1 /sys/class/thermal/thermal_zone0/temp")
             temp = int(s) * 0.001
-            self.logger.logInfo("cpu temp: {}C°".format(temp))
+            self.logger.logDebug("cpu temp: {}C°", args=(temp,))
             self.logger.logSensorData("cpu_temp",{ "cpu_temp" : temp})
             return temp
         except Exception as e:
@@ -58,7 +59,7 @@ class SystemParameters(TelemetryDataSource):
         output = ""
         try:
             output = self.execute("df -h | sort -h -k3 -r | tr -s ' ' | cut -d ' ' -f 3 | head -n 1")
-            self.logger.logInfo("sd_volume size: {}".format(output))
+            self.logger.logDebug("sd_volume size: {}", args=(output,))
             self.logger.logSensorData("sd_volume_size",{ "sd_volume size" : output})
             return float(self.extractNumber(output)) 
         except Exception as e:
@@ -70,7 +71,7 @@ class SystemParameters(TelemetryDataSource):
         output = ""
         try:
             output = self.execute("df -h | sort -h -k3 -r | tr -s ' ' | cut -d ' ' -f 3 | head -n 2 | tail -1")
-            self.logger.logInfo("usb_volume size: {}".format(output))
+            self.logger.logDebug("usb_volume size: {}", args=(output,))
             self.logger.logSensorData("usb_volume_size",{ "usb_volume size" : output})
             return float(self.extractNumber(output)) 
         except Exception as e:
@@ -81,7 +82,7 @@ class SystemParameters(TelemetryDataSource):
         output = ""
         try:
             output = self.execute("free -h | head -2 | tail -1 | tr -s ' ' | cut -d ' ' -f 3")
-            self.logger.logInfo("ram_usage: {}".format(output))
+            self.logger.logDebug("ram_usage: {}", args=(output,))
             self.logger.logSensorData("ram_usage",{ "ram_usage" : output})
             return float(self.extractNumber(output))
         except Exception as e:
@@ -94,7 +95,7 @@ class SystemParameters(TelemetryDataSource):
         output = ""
         try:
             output = self.execute("uptime | tr -s ' ' | cut -d ' ' -f11")
-            self.logger.logInfo("cpu_usage: {}".format(output))
+            self.logger.logDebug("cpu_usage: {}", args=(output,))
             self.logger.logSensorData("cpu_usage",{ "cpu_usage" : output})
             return float(self.extractNumber(output))
         except Exception as e:
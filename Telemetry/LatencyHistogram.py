@@ -0,0 +1,85 @@
+import os
+import json
+import threading
+from bisect import bisect_left
+
+LATENCY_MIN_BUCKET = 0.001 # seconds, upper bound of the first bucket
+LATENCY_BUCKETS = 22 # buckets double in size, the last one ends at ~35 minutes
+
+""" Log scaled latency histograms, adding a value is O(log buckets) and never allocates """
+
+class LatencyHistogram():
+    def __init__(self, minBucket = LATENCY_MIN_BUCKET, buckets = LATENCY_BUCKETS):
+        self.bounds = [minBucket * 2**n for n in range(buckets)]
+        self.counts = [0] * (buckets + 1) # the last count is everything above the last bound
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value : float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p : float):
+        """ upper bound of the bucket the p-th percentile falls into, the max for the overflow bucket """
+        if(self.count == 0):
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for n, count in enumerate(self.counts):
+            seen += count
+            if(seen >= rank and count > 0):
+                return self.bounds[n] if n < len(self.bounds) else self.max
+        return self.max
+
+    def getSummary(self):
+        return {"count" : self.count,
+                "mean" : self.sum / self.count if self.count > 0 else None,
+                "p50" : self.percentile(50),
+                "p90" : self.percentile(90),
+                "p99" : self.percentile(99),
+                "max" : self.max}
+
+    def toDict(self):
+        return {"bounds" : self.bounds, "counts" : self.counts, "summary" : self.getSummary()}
+
+
+class LatencyStats():
+    """ Histograms by key, e.g. "field:tmp1_1", "source:MPU6050" or "queue_wait" """
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def add(self, key : str, value : float):
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if(histogram == None):
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.add(value)
+
+    def get(self, key : str):
+        return self.histograms.get(key)
+
+    def percentile(self, key : str, p : float):
+        with self.lock:
+            histogram = self.histograms.get(key)
+            return None if histogram == None else histogram.percentile(p)
+
+    def getSummaries(self):
+        with self.lock:
+            return {key : histogram.getSummary() for key, histogram in self.histograms.items()}
+
+    def dump(self, path : str):
+        """ writes all histograms as JSON, replaces path atomically """
+        with self.lock:
+            data = {key : histogram.toDict() for key, histogram in sorted(self.histograms.items())}
+
+        tmpPath = path + ".tmp"
+        with open(tmpPath, mode='w') as file:
+            json.dump(data, file, indent=1)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmpPath, path)
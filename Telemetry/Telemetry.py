@@ -1,13 +1,36 @@
 import abc
 from enum import Enum
-from Bus.I2C import PythonWire
+from Bus.I2C import PythonWire, I2C_PRIORITY_TELEMETRY
+import os
 import time
-from Logger.Logger import Logger
+from Logger.Logger import Logger, LOG_DIRECTORY
+from Telemetry.LatencyHistogram import LatencyStats
+from Telemetry.TelemetrySpool import TelemetrySpool, TELE_SPOOL_FILE
+from Telemetry.TelemetryCodec import TeleCodec, BINARY_FLOAT_SCALE, BINARY_INT, BINARY_FLOAT, encodeBinaryField
+import queue
 import threading
+from collections import deque
+from concurrent.futures import Future, wait
 
 START_STRING = "INITIATE_EXPERIMENT"
+START_SIGNAL_READ_SIZE = 200 # bytes read from the ISS per check
+
+DELTA_FLOAT_THRESHOLD = 0.01 # floats are sent with 2 digits, smaller changes are invisible on ground
+DELTA_KEYFRAME_INTERVAL = 10 # every n-th state is sent completely so the ground can resync
+TELEMETRY_QUEUE_SIZE = 64 # packets waiting for transmission, older ones are outdated anyway
+TELE_MAX_AGE = 5 # default seconds a cached getTeleData result may be old, sources override teleMaxAge
+TELE_CACHE_TICK = 0.5 # seconds between checks of the telemetry cache
+TELE_TIMEOUT = 2 # default seconds a source may take before its last snapshot is used, sources override teleTimeout
+TELE_WORKERS = 4 # threads reading telemetry sources in parallel
+TELE_BACKLOG_PACKETS = 8 # queued packets at which the transmitter paces at minTransmissionDelay
+TELE_LATENCY_FILE = "telemetry_latency.json"
+TELE_RETRY_DELAY = 1 # seconds before a failed packet is sent again, doubles with every attempt
+TELE_RETRY_MAX_DELAY = 60 # upper bound of the retry backoff
+TELE_RETRY_ATTEMPTS = 8 # a packet is dropped after this many failed transmissions
 
 class TelemetryDataSource(metaclass=abc.ABCMeta):
+    teleMaxAge = TELE_MAX_AGE
+
     @classmethod
     def __subclasshook__(cls, subclass):
         return (hasattr(subclass, 'getTeleData') and 
@@ -22,6 +45,17 @@ class TeleDatatypes(Enum):
     INT = 0
     FLOAT = 1
 
+    def encode(self, name : str, data, codec : TeleCodec = TeleCodec.TEXT):
+        """ returns the datum as text (str) or binary (bytes) field """
+        if(codec == TeleCodec.BINARY):
+            return self.toBinaryDatum(name, data)
+        return self.toDataTypeString(name, data)
+
+    def toBinaryDatum(self, name : str, data):
+        if(self.value == TeleDatatypes.FLOAT.value):
+            return encodeBinaryField(name, round(float(data) * BINARY_FLOAT_SCALE), BINARY_FLOAT)
+        return encodeBinaryField(name, int(data), BINARY_INT)
+
     def toDataTypeString(self, name : str, data):
         if(self.value == TeleDatatypes.INT.value):
             return self._intToByteDatum(name,data)
@@ -30,7 +64,7 @@ class TeleDatatypes(Enum):
             return self._floatToByteDatum(name,data)
 
         else:
-            logger = Logger("Enum")
+            logger = Logger.get("Enum")
             logger.logErr("Unknown Data Type can't be converted")
             return ""
 
@@ -41,147 +75,755 @@ class TeleDatatypes(Enum):
         return  '"{0}":{1}'.format(str(name), int(data))
 
 
-class PackageQueue():
-    def __init__(self):
-        self.logger = Logger("PackageQueue")
-        self.queue = []
+class DropPolicy(Enum):
+    OLDEST = 0 # a full queue drops the oldest package of the lowest priority
+    COALESCE = 1 # a package replaces a queued one with the same key, otherwise like OLDEST
+
+
+class WindowAggregate():
+    """ min/max/mean of the samples of one field since the last telemetry state, updated in O(1) per sample """
+
+    def __init__(self, stats : tuple = ("min", "max", "mean")):
+        self.stats = stats
+        self.lock = threading.Lock()
+        self.last = None
+        self.current = None # value of the field when the source was last read, used until samples arrive
+        self._reset()
+
+    def add(self, value):
+        with self.lock:
+            self.last = value
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min == None or value < self.min else self.min
+            self.max = value if self.max == None or value > self.max else self.max
+
+    def collect(self, name : str, typ : TeleDatatypes):
+        """ returns the telemetry fields of the window (last value as name, stats as name_<stat>) and starts a new window """
+        with self.lock:
+            fields = {}
+            last = self.current if self.last == None else self.last
+            if(last != None):
+                fields[name] = (last, typ)
+            if(self.count > 0):
+                values = {"min" : (self.min, typ), "max" : (self.max, typ), "mean" : (self.sum / self.count, TeleDatatypes.FLOAT)}
+                for stat in self.stats:
+                    fields["{}_{}".format(name, stat)] = values[stat]
+            self._reset()
+            return fields
+
+    def _reset(self):
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+
+def expandAggregates(dicts : 'list[dict]'):
+    """ replaces the WindowAggregates of registry fields with stats in telemetry dicts by their fields """
+    expanded = []
+    for d in dicts:
+        if(not any(isinstance(v[0], WindowAggregate) for v in d.values())):
+            expanded.append(d)
+            continue
+
+        # dirty flags of a registry carry over to the fields of its aggregates
+        dirty = d.takeDirty() if isinstance(d, TeleValues) else None
+        fields = TeleValues() if dirty != None else {}
+        for k, v in d.items():
+            new = v[0].collect(k, v[1]) if isinstance(v[0], WindowAggregate) else {k : v}
+            fields.update(new)
+            if(dirty != None and k in dirty):
+                fields.dirty.update(new.keys())
+        expanded.append(fields)
+    return expanded
+
+
+class TeleValues(dict):
+    """ name -> (value, TeleDatatypes) of a TelemetryRegistry with the names changed since takeDirty """
 
-    def add(self, package):
-        self.queue.append(package)
-    
-    def pop(self):
-        if(len(self.queue) > 0):
-            ele = self.queue[0]
-            self.queue = self.queue[1:]
-            return ele
+    def __init__(self):
+        super().__init__()
+        self.dirty = set()
+        self.times = {} # name -> monotonic time of the last push
+        self.lock = threading.Lock()
+
+    def markDirty(self, name : str):
+        with self.lock:
+            self.dirty.add(name)
+
+    def touch(self, name : str):
+        self.times[name] = time.monotonic()
+
+    def takeDirty(self):
+        with self.lock:
+            dirty = self.dirty
+            self.dirty = set()
+            return dirty
+
+
+class TeleField():
+    def __init__(self, values : TeleValues, name : str, typ : TeleDatatypes, value, aggregate : WindowAggregate = None):
+        self.values = values
+        self.name = name
+        self.typ = typ
+        self.aggregate = aggregate
+        if(aggregate != None):
+            aggregate.current = value
+            values[name] = (aggregate, typ)
         else:
-            self.logger.logErr("Trying to pop from a empty queue")
-    
-    def length(self):
-        return len(self.queue)
-        
-
-class ISSTelemetry(PythonWire):
-    def __init__(self, systems : 'list[TelemetryDataSource]' , address=42, transmissionDelay = 5.5 , maxBytesForTransmission = 200, protocolBytes = 2):
-        super().__init__(address, maxBytesForTransmission)
-        super().begin()
-        self.logger = Logger("ISSTelemetry")
-        self.lastTransmission = 0
-        self.transmissionDelay = transmissionDelay
-        self.transmitting = False
-        self.receiving = False
-        self.queue = PackageQueue()
-        self.systems = systems
-        self.experimentStarted = False
-        self.maxBytesForString = maxBytesForTransmission - protocolBytes
-    
-    def createString(self, data_dict : 'dict[str,int]', type_dict : 'dict[str,TeleDatatypes]', maxLength, startString=""):
-        try:
-            strings = [startString]
-            currentPos = 0
-
-            if(len(startString) > maxLength):
-                self.logger.logErr("Error creating string from dict of values: start string={} bigger maxLength={}".format(startString, maxLength))
+            values[name] = (value, typ)
+        values.markDirty(name)
+        values.touch(name)
+
+    def set(self, value):
+        self.values.touch(self.name)
+        if(self.aggregate != None):
+            self.aggregate.add(value)
+        elif(self.values[self.name][0] != value):
+            self.values[self.name] = (value, self.typ)
+        else:
+            return
+        self.values.markDirty(self.name)
 
-            for k in data_dict.keys():
-                dat = data_dict[k]
-                typ = type_dict[k]
+    def get(self):
+        if(self.aggregate != None):
+            return self.aggregate.current if self.aggregate.last == None else self.aggregate.last
+        return self.values[self.name][0]
 
-                newPart = typ.toDataTypeString(k, dat)
-                
-                if(len(newPart) > maxLength):
-                    self.logger.logErr("Maxlength to small for strings")
-                    return []
 
-                if(len(strings[currentPos]) + len(newPart) + 1 < maxLength):
-                    strings[currentPos] += newPart + ","
+class TelemetryRegistry(TelemetryDataSource):
+    """
+    Telemetry fields a subsystem registers once and pushes values to when they change. getTeleData
+    returns the same TeleValues every time, so polling allocates nothing and ISSTelemetry can
+    take the changed fields from its dirty flags.
+    """
 
-                else:
-                    if (strings[currentPos][-1] != "\n"):
-                        strings[currentPos] =  strings[currentPos][:-1] + "\n"
-                    currentPos += 1
-                    strings.append(newPart + ",")
+    def __init__(self):
+        self.values = TeleValues()
+        self.fields = {}
 
-            return strings
+    def register(self, name : str, typ : TeleDatatypes, value = 0, stats : tuple = None):
+        """ stats aggregates the field between packets like WindowAggregate """
+        field = TeleField(self.values, name, typ, value, None if stats == None else WindowAggregate(stats))
+        self.fields[name] = field
+        return field
 
-        except IndexError as e:
-            self.logger.logErr("Error creating string for dict : {}".format(data_dict),e)
-            return []
-        
+    def get(self, name : str):
+        return self.fields[name]
 
-    def sendCurrentStates(self, dicts : 'list[TelemetryDataSource]'):
+    def getTeleData(self):
+        return self.values
 
-        strings = []
-        startString = ""
 
-        try:
+class PackageQueue():
+    """ Thread safe FIFO queue with priority classes, packages with a higher priority are popped first """
 
-            for count, d in enumerate(dicts):
-                data_dict = {}
-                type_dict = {}
+    def __init__(self, maxSize = None, dropPolicy = DropPolicy.OLDEST):
+        self.logger = Logger("PackageQueue")
+        self.maxSize = maxSize
+        self.dropPolicy = dropPolicy
+        self.queues = {} # priority -> deque of entries [key, package]
+        self.priorities = [] # descending
+        self.keys = {} # key -> entry, only used by COALESCE
+        self.size = 0
+        self.highWatermark = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.lock = threading.Lock()
+
+    def add(self, package, priority = 0, key = None):
+        """ key identifies packages for COALESCE, the package itself is used if it's None """
+        with self.lock:
+            if(self.dropPolicy == DropPolicy.COALESCE):
+                key = package if key == None else key
+                entry = self.keys.get(key)
+                if(entry != None):
+                    entry[1] = package
+                    self.coalesced += 1
+                    return
+
+            if(self.maxSize != None and self.size >= self.maxSize):
+                self._dropOldest()
+
+            if(not priority in self.queues):
+                self.queues[priority] = deque()
+                self.priorities = sorted(self.queues.keys(), reverse=True)
+
+            entry = [key, package]
+            self.queues[priority].append(entry)
+            if(self.dropPolicy == DropPolicy.COALESCE):
+                self.keys[key] = entry
+            self.size += 1
+            self.highWatermark = max(self.highWatermark, self.size)
 
-                for k in d.keys():
-                    data_dict[k] = d[k][0]
-                    type_dict[k] = d[k][1]
+    def pop(self):
+        with self.lock:
+            for priority in self.priorities:
+                if(len(self.queues[priority]) > 0):
+                    return self._remove(self.queues[priority].popleft())
 
-                newStrings = self.createString(data_dict,type_dict,self.maxBytesForString,startString=startString)
-                strings += newStrings
-                if(count != len(dicts) -1):
-                    if(len(strings[len(strings) - 1]) < self.maxBytesForString):
-                        startString = strings[-1]
-                        strings = strings[:-1]
-                    else:
-                        startString = ""
+        self.logger.logErr("Trying to pop from a empty queue")
 
-            if(strings[-1][-1] != '\n'):
-                strings[-1] = strings[-1][:-1] + '\n'
+    def length(self):
+        return self.size
+
+    def getStats(self):
+        return {"length" : self.size, "high_watermark" : self.highWatermark, "dropped" : self.dropped, "coalesced" : self.coalesced}
+
+    def _dropOldest(self):
+        for priority in reversed(self.priorities):
+            if(len(self.queues[priority]) > 0):
+                self._remove(self.queues[priority].popleft())
+                self.dropped += 1
+                return
+
+    def _remove(self, entry : list):
+        self.size -= 1
+        if(self.dropPolicy == DropPolicy.COALESCE):
+            self.keys.pop(entry[0], None)
+        return entry[1]
+
+
+class DeltaFilter():
+    """ Drops telemetry fields that did not change by more than their threshold since they were last sent """
+
+    def __init__(self, thresholds : 'dict[str,float]' = {}, keyframeInterval = DELTA_KEYFRAME_INTERVAL):
+        self.thresholds = thresholds
+        self.keyframeInterval = keyframeInterval
+        self.lastSent = {}
+        self.cycle = 0
+
+    def filter(self, dicts : 'list[dict]'):
+        keyframe = self.cycle % self.keyframeInterval == 0
+        self.cycle += 1
+
+        changedDicts = []
+        for d in dicts:
+            changed = {}
+            # registry values flag what changed since the last state, only those are compared
+            dirty = d.takeDirty() if isinstance(d, TeleValues) else None
+            for k in (d.keys() if keyframe or dirty == None else [k for k in d.keys() if k in dirty]):
+                if(keyframe or self.hasChanged(k, d[k][0], d[k][1])):
+                    changed[k] = d[k]
+                    self.lastSent[k] = d[k][0]
+            if(len(changed) > 0):
+                changedDicts.append(changed)
+        return changedDicts
+
+    def hasChanged(self, name : str, value, typ : TeleDatatypes):
+        if(not name in self.lastSent):
+            return True
+
+        threshold = self.thresholds.get(name, DELTA_FLOAT_THRESHOLD if typ == TeleDatatypes.FLOAT else 0)
+        try:
+            return abs(value - self.lastSent[name]) > threshold
+        except TypeError:
+            return value != self.lastSent[name]
+
+    def forceKeyframe(self):
+        self.cycle = 0
+
+
+class PacketPacker():
+    """
+    Packs encoded telemetry fields into as few packets as possible (first fit decreasing).
+    Fields of a group (by default the name up to the last '_', e.g. tmp1_1..tmp1_3 or acc_x..acc_z)
+    are kept in one packet if the group fits into one, fields with a higher priority go to earlier packets.
+    """
+
+    def __init__(self, codec : TeleCodec, maxLength : int, priorities : 'dict[str,int]' = {}, groups : 'dict[str,str]' = {}):
+        self.codec = codec
+        self.maxLength = maxLength
+        self.priorities = priorities
+        self.groups = groups
+
+    def getGroup(self, name : str):
+        if(name in self.groups):
+            return self.groups[name]
+        return name.rsplit("_", 1)[0]
+
+    def fits(self, size : int, count : int):
+        return self.codec.packetLength(size, count) <= self.maxLength
+
+    def pack(self, parts : 'list[tuple[str,object]]'):
+        """ parts are (field name, encoded field) in dict order, returns lists of (field name, encoded field) per packet """
+        grouped = {}
+        for name, part in parts:
+            grouped.setdefault(self.getGroup(name), []).append((name, part))
+
+        items = []
+        for members in grouped.values():
+            size = sum(len(p) for _, p in members)
+            if(self.fits(size, len(members))):
+                items.append((max(self.priorities.get(n, 0) for n, _ in members), size, members))
+            else:
+                # group doesn't fit into a single packet, its fields are packed on their own
+                items += [(self.priorities.get(n, 0), len(p), [(n, p)]) for n, p in members]
+
+        # stable sort keeps the dict order for items of the same priority and size
+        items.sort(key=lambda item: (-item[0], -item[1]))
+
+        packets = [] # [size, count, parts]
+        for _, size, itemParts in items:
+            for packet in packets:
+                if(self.fits(packet[0] + size, packet[1] + len(itemParts))):
+                    break
+            else:
+                packet = [0, 0, []]
+                packets.append(packet)
+            packet[0] += size
+            packet[1] += len(itemParts)
+            packet[2] += itemParts
+
+        return [packet[2] for packet in packets]
+
+
+class SourcePool():
+    """
+    Daemon threads fed by a queue that run the reads of the telemetry sources. Unlike ThreadPoolExecutor
+    the interpreter doesn't join them at exit, so a read stuck on a stalled device can't block the shutdown.
+    """
+
+    def __init__(self, workers = TELE_WORKERS, name = "TelemetrySource"):
+        self.queue = queue.Queue()
+        self.closed = False
+        self.threads = [threading.Thread(target=self._workLoop, name="{}_{}".format(name, n), daemon=True) for n in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, func, *args):
+        """ returns a concurrent.futures.Future of func(*args) """
+        if(self.closed):
+            raise RuntimeError("Telemetry source pool is shut down")
+        future = Future()
+        self.queue.put((future, func, args))
+        return future
+
+    def shutdown(self, wait = True, cancel_futures = False):
+        self.closed = True
+        if(cancel_futures):
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if(item != None):
+                    item[0].cancel()
+        # one stop marker per thread, a thread stuck in a read takes its marker once the read returns
+        for thread in self.threads:
+            self.queue.put(None)
+        if(wait):
+            for thread in self.threads:
+                thread.join()
+
+    def _workLoop(self):
+        while True:
+            item = self.queue.get()
+            if(item == None):
+                return
+            future, func, args = item
+            if(not future.set_running_or_notify_cancel()):
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class TelemetryCache():
+    """
+    Keeps the latest getTeleData result of every source and refreshes it in the background
+    once it's older than the teleMaxAge of the source, so reading a snapshot never waits for a source.
+    Outdated sources are read in parallel by a small worker pool, a source that misses its
+    teleTimeout keeps its last good snapshot until the stalled read returns.
+    """
+
+    def __init__(self, sources : 'list[TelemetryDataSource]', tick = TELE_CACHE_TICK, workers = TELE_WORKERS):
+        self.logger = Logger("TelemetryCache")
+        self.sources = sources
+        self.tick = tick
+        self.snapshots = [None] * len(sources) # (monotonic time, data, latency) per source
+        self.attempts = [None] * len(sources) # monotonic time of the last refresh, failed ones included
+        self.pending = [None] * len(sources) # running read per source
+        self.workers = workers
+        self.pool = None
+        self.poolLock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        if(self.running == False):
+            self.refresh()
+            self.running = True
+            threading.Thread(target=self._refreshLoop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        with self.poolLock:
+            if(self.pool != None):
+                # reads still running are left behind, they end with their daemon thread
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+
+    def _getPool(self):
+        with self.poolLock:
+            if(self.pool == None):
+                self.pool = SourcePool(self.workers)
+            return self.pool
+
+    def refresh(self):
+        """ refreshes all sources with an outdated snapshot, waits at most until the deadline of each source """
+        started = []
+        for n, source in enumerate(self.sources):
+            attempt = self.attempts[n]
+            maxAge = getattr(source, "teleMaxAge", TELE_MAX_AGE)
+            if(self.pending[n] == None and (attempt == None or time.monotonic() - attempt >= maxAge)):
+                self.attempts[n] = time.monotonic()
+                try:
+                    future = self._getPool().submit(self._refreshSource, n, source)
+                except RuntimeError:
+                    # stopped meanwhile
+                    break
+                self.pending[n] = future
+                # runs right away if the read already finished
+                future.add_done_callback(lambda f, n=n: self._clearPending(n, f))
+                started.append(n)
+
+        for n in started:
+            deadline = self.attempts[n] + getattr(self.sources[n], "teleTimeout", TELE_TIMEOUT)
+            future = self.pending[n]
+            if(future != None):
+                wait([future], timeout=max(0, deadline - time.monotonic()))
+                if(not future.done()):
+                    self.logger.logErr("Telemetry of {} missed its deadline, keeping the last snapshot".format(type(self.sources[n]).__name__))
+
+    def getSnapshot(self):
+        """ returns the cached dicts of all sources that delivered data """
+        return self.getSnapshotSamples()[0]
+
+    def getSnapshotSamples(self):
+        """ returns (cached dicts, field name -> (source name, monotonic sample time)) """
+        if(self.running == False):
+            self.refresh()
+
+        dicts = []
+        samples = {}
+        for source, snapshot in zip(self.sources, list(self.snapshots)):
+            if(snapshot == None):
+                continue
+            data = snapshot[1]
+            name = type(source).__name__
+            # registry fields carry the time of their last push, others the time the source was read
+            times = data.times if isinstance(data, TeleValues) else {}
+            for k in data.keys():
+                samples[k] = (name, times.get(k, snapshot[0]))
+            dicts.append(data)
+        return dicts, samples
+
+    def getAge(self, n : int):
+        snapshot = self.snapshots[n]
+        return None if snapshot == None else time.monotonic() - snapshot[0]
+
+    def getLatencies(self):
+        """ returns source name -> seconds its last read took, for a stalled read the time it's running """
+        latencies = {}
+        for n, source in enumerate(self.sources):
+            latency = None
+            if(self.pending[n] != None):
+                latency = time.monotonic() - self.attempts[n]
+            elif(self.snapshots[n] != None):
+                latency = self.snapshots[n][2]
+            latencies[type(source).__name__] = latency
+        return latencies
+
+    def _refreshSource(self, n : int, source : TelemetryDataSource):
+        start = time.monotonic()
+        try:
+            data = source.getTeleData()
+            end = time.monotonic()
+            # the tuple is replaced as a whole, readers see either the old or the new snapshot
+            self.snapshots[n] = (end, data, end - start)
+        except Exception as e:
+            self.logger.logErr("Error refreshing telemetry of {}, keeping the last snapshot".format(type(source).__name__), e)
+
+    def _clearPending(self, n : int, future):
+        if(self.pending[n] is future):
+            self.pending[n] = None
+
+    def _refreshLoop(self):
+        while self.running:
+            self.refresh()
+            time.sleep(self.tick)
+
+
+class StreamMatcher():
+    """
+    Finds a byte pattern in a stream of reads. Every read goes into the preallocated buffer behind
+    the last len(pattern) - 1 bytes of the previous read, so a pattern split between reads is found too.
+    """
+
+    def __init__(self, pattern : bytes, readSize : int):
+        self.pattern = pattern
+        self.overlap = len(pattern) - 1
+        self.buffer = bytearray(self.overlap + readSize)
+        self.view = memoryview(self.buffer)
+
+    def match(self):
+        """ searches the data read into buffer[overlap:] and keeps its tail for the next read """
+        found = self.buffer.find(self.pattern) >= 0
+        if(self.overlap > 0):
+            self.view[:self.overlap] = self.view[-self.overlap:]
+        return found
+
+    def reset(self):
+        self.view[:self.overlap] = bytes(self.overlap)
 
-            for string in strings:
-                self.queue.add(string)
 
-        except IndexError as e:
-            self.logger.logErr("Error creating Telemetry String",e)
+class ISSTelemetry(PythonWire):
+    def __init__(self, systems : 'list[TelemetryDataSource]' , address=42, transmissionDelay = 5.5 , maxBytesForTransmission = 200, protocolBytes = 2, deltaMode = False, deltaThresholds : 'dict[str,float]' = {}, codec : TeleCodec = TeleCodec.TEXT, fieldPriorities : 'dict[str,int]' = {}, fieldGroups : 'dict[str,str]' = {}, minTransmissionDelay = None, latencyTelemetry = False, spoolPath = TELE_SPOOL_FILE):
+        super().__init__(address, maxBytesForTransmission, I2C_PRIORITY_TELEMETRY)
+        super().begin()
+        self.logger = Logger("ISSTelemetry")
+        self.lastTransmission = -transmissionDelay
+        self.transmissionDelay = transmissionDelay
+        self.minTransmissionDelay = transmissionDelay if minTransmissionDelay == None else minTransmissionDelay
+        self.wakeup = threading.Event()
+        self.transmitting = False
+        self.receiving = False
+        self.queue = PackageQueue(TELEMETRY_QUEUE_SIZE)
+        self.systems = systems
+        self.cache = TelemetryCache(systems)
+        self.experimentStarted = False
+        self.startMatcher = StreamMatcher(START_STRING.encode('utf-8'), START_SIGNAL_READ_SIZE)
+        self.maxBytesForString = maxBytesForTransmission - protocolBytes
+        self.deltaFilter = DeltaFilter(deltaThresholds) if deltaMode else None
+        self.codec = codec
+        self.fieldPriorities = fieldPriorities
+        self.fieldGroups = fieldGroups
+        self.latencies = LatencyStats()
+        self.retry = None # (queue entry, failed attempts, monotonic time of the next attempt)
+        self.spool = None
+        if(spoolPath != None):
+            try:
+                self.spool = TelemetrySpool(spoolPath)
+            except Exception as e:
+                self.logger.logErr("Error opening telemetry spool {}, unsent packets won't survive a reboot".format(spoolPath), e)
+        self.latencyTelemetry = latencyTelemetry
+    
+    def createString(self, data_dict : 'dict[str,int]', type_dict : 'dict[str,TeleDatatypes]', maxLength, fieldNames : list = None):
+        """ returns the finished packets (str or bytes depending on the codec) for all fields of data_dict, fieldNames gets the field names per packet """
+        parts = []
+        for k in data_dict.keys():
+            try:
+                newPart = type_dict[k].encode(k, data_dict[k], self.codec)
+            except (ValueError, OverflowError, TypeError) as e:
+                self.logger.logErr("Telemetry field {} can't be encoded: {}".format(k, data_dict[k]), e)
+                continue
+
+            if(self.codec.packetLength(len(newPart), 1) > maxLength):
+                self.logger.logErr("Maxlength to small for strings")
+                return []
+            parts.append((k, newPart))
+
+        packer = PacketPacker(self.codec, maxLength, self.fieldPriorities, self.fieldGroups)
+        packets = packer.pack(parts)
+        if(fieldNames != None):
+            fieldNames += [[n for n, _ in packet] for packet in packets]
+        return [self.codec.finishPacket([p for _, p in packet]) for packet in packets]
+
+
+    def sendCurrentStates(self, dicts : 'list[TelemetryDataSource]', samples : 'dict[str,tuple]' = {}):
+        """ samples are field name -> (source name, monotonic sample time) for the latency statistics """
+
+        dicts = expandAggregates(dicts)
+        if(self.latencyTelemetry):
+            dicts = dicts + [self.getLatencyTeleData()]
+
+        if(self.deltaFilter != None):
+            dicts = self.deltaFilter.filter(dicts)
+            if(len(dicts) == 0):
+                return
+
+        # all sources are packed together so packets aren't split at the end of each source
+        data_dict = {}
+        type_dict = {}
+        for d in dicts:
+            for k in d.keys():
+                data_dict[k] = d[k][0]
+                type_dict[k] = d[k][1]
+
+        fieldNames = []
+        packets = self.createString(data_dict,type_dict,self.maxBytesForString,fieldNames)
+        if(len(packets) == 0):
+            self.logger.logErr("Error creating Telemetry String: no data")
+
+        now = time.monotonic()
+        for packet, names in zip(packets, fieldNames):
+            # aggregated fields (name_stat) are sampled like their base field
+            packetSamples = [(n,) + samples.get(n, samples.get(n.rsplit("_", 1)[0], (None, None))) for n in names]
+            self.queue.add((packet, now, packetSamples, self._spool(packet)))
+
+    def writeString(self, string):
+        """ sends a text (str) or binary (bytes) packet, returns False if the I2C write failed """
+        payload = string.encode('utf-8') if type(string) == str else bytes(string)
 
-    def writeString(self, string : str):
         self.beginTransmission()
         
         # protocol for microship
         self.write(1)
-        self.write(len(string))
+        self.write(len(payload))
 
-        if (len(self.buffer) + len(string) <= self.maxBytesForWrite):
-            for d in string.encode('utf-8'):
+        if (len(self.buffer) + len(payload) <= self.maxBytesForWrite):
+            for d in payload:
                 self.write(d)
         else:
-            self.logger.logErr("Buffer Overflow when trying to send string over i2c: str = {}, len = {}".format(string, len(string)))
+            self.logger.logErr("Buffer Overflow when trying to send string over i2c: str = {}, len = {}".format(string, len(payload)))
 
-        self.endTransmission()
+        return self.endTransmission()
 
     def startTransmitting(self):
+        """ starts the transmitter thread, the only place packets are sent from while it's running """
         if(self.transmitting == False):
             self.transmitting = True
+            self.cache.start()
             threading.Thread(target=self._transmitLoop).start()
 
+    def submit(self, package, priority = 0):
+        """ queues a packet (str or bytes) for the transmitter """
+        self.queue.add((package, time.monotonic(), [], self._spool(package)), priority)
+        self.wakeup.set()
+
+    def getTransmissionDelay(self):
+        """ spacing of the next transmission, shrinks towards minTransmissionDelay while packets pile up """
+        backlog = min(self.queue.length(), TELE_BACKLOG_PACKETS) / TELE_BACKLOG_PACKETS
+        return self.transmissionDelay - backlog * (self.transmissionDelay - self.minTransmissionDelay)
+
     def _transmitLoop(self):
+        lastSlot = float("-inf")
         while self.transmitting:
-            self.transmit()
-            time.sleep(1)
+            delay = self.getTransmissionDelay()
+            deadline = lastSlot + delay
+            now = time.monotonic()
+            if(deadline > now):
+                # submit and stopTransmitting wake the loop up, a grown backlog moves the deadline forward
+                self.wakeup.wait(deadline - now)
+                self.wakeup.clear()
+                continue
+
+            # slots are kept on the monotonic grid, a late one (e.g. a stalled bus) isn't caught up with a burst
+            lastSlot = deadline if now - deadline < delay else now
+            self._transmitNext()
 
     def transmit(self):
-        if(self.lastTransmission + self.transmissionDelay < time.time()):
-
+        """ sends the next packet if the last one is at least transmissionDelay ago, use submit while the transmitter runs """
+        if(self.lastTransmission + self.transmissionDelay < time.monotonic()):
+            self._transmitNext()
+
+    def _transmitNext(self):
+        entry = None
+        if(self.retry != None):
+            # a failed packet is retried before anything else once its backoff is over
+            if(self.retry[2] <= time.monotonic()):
+                entry = self.retry[0]
+        else:
             if(self.queue.length() == 0):
-                self.sendCurrentStates([s.getTeleData() for s in self.systems])
-            
+                self.sendCurrentStates(*self.cache.getSnapshotSamples())
             if(self.queue.length() != 0):
-                dat = self.queue.pop()
-                self.writeString(dat)
+                entry = self.queue.pop()
+
+        if(entry != None):
+            dat, queued, samples, seq = entry
+            if(self.writeString(dat)):
+                self.retry = None
+                self._spoolDone(seq)
+                self._recordLatencies(queued, samples)
                 self.logger.logInfo("Telemtry Data Package: {}".format(dat))
-
-            self.lastTransmission = time.time()	
+            else:
+                self._scheduleRetry(entry)
+
+        # everything spooled is sent or was dropped, the spool starts over
+        if(self.spool != None and self.retry == None and self.queue.length() == 0 and self.spool.getSize() > 0):
+            self.spool.reset()
+
+        self.lastTransmission = time.monotonic()
+
+    def _scheduleRetry(self, entry : tuple):
+        attempts = 1 if self.retry == None else self.retry[1] + 1
+        if(entry[3] == None):
+            # only packets that failed are spooled, so a healthy link never writes to the SD card
+            entry = entry[:3] + (self._spoolAdd(entry[0]),)
+        if(attempts >= TELE_RETRY_ATTEMPTS):
+            self.logger.logErr("Dropping telemetry packet after {} failed transmissions: {}".format(attempts, entry[0]))
+            self.retry = None
+            self._spoolDone(entry[3])
+        else:
+            delay = min(TELE_RETRY_MAX_DELAY, TELE_RETRY_DELAY * 2**(attempts - 1))
+            self.retry = (entry, attempts, time.monotonic() + delay)
+
+    def _spool(self, packet):
+        """ spools packets queued while the link is failing, they wait behind the retried packet """
+        if(self.retry == None):
+            return None
+        return self._spoolAdd(packet)
+
+    def _spoolAdd(self, packet):
+        if(self.spool == None):
+            return None
+        try:
+            return self.spool.add(packet)
+        except Exception as e:
+            self.logger.logErr("Error spooling telemetry packet", e)
+            return None
+
+    def _spoolDone(self, seq : int):
+        if(self.spool != None and seq != None):
+            try:
+                self.spool.done(seq)
+            except Exception as e:
+                self.logger.logErr("Error marking spooled telemetry packet {} as sent".format(seq), e)
+
+    def replaySpool(self):
+        """ queues the packets a previous run couldn't send, returns their number """
+        if(self.spool == None):
+            return 0
+        pending = self.spool.takePending()
+        for seq, packet in pending:
+            self.queue.add((packet, time.monotonic(), [], seq))
+        return len(pending)
+
+    def discardSpool(self):
+        if(self.spool != None):
+            self.spool.reset()
     
     def stopTransmitting(self):
         self.transmitting = False
+        self.wakeup.set()
+        self.cache.stop()
+        self.dumpLatencies()
+
+    def _recordLatencies(self, queued : float, samples : list):
+        now = time.monotonic()
+        self.latencies.add("queue_wait", now - queued)
+        for name, source, sampled in samples:
+            if(sampled != None):
+                self.latencies.add("field:" + name, now - sampled)
+                self.latencies.add("source:" + source, now - sampled)
+                self.latencies.add("all_fields", now - sampled)
+
+    def getLatencyTeleData(self):
+        """ 90th percentiles of the sample to wire latency and the queue wait in ms """
+        age = self.latencies.percentile("all_fields", 90)
+        wait = self.latencies.percentile("queue_wait", 90)
+        return {"tele_age_p90" : (-1 if age == None else int(age * 1000), TeleDatatypes.INT),
+                "tele_wait_p90" : (-1 if wait == None else int(wait * 1000), TeleDatatypes.INT)}
+
+    def dumpLatencies(self, path = None):
+        """ writes the latency histograms to path, default TELE_LATENCY_FILE in the log directory """
+        path = os.path.join(LOG_DIRECTORY, TELE_LATENCY_FILE) if path == None else path
+        try:
+            self.latencies.dump(path)
+        except Exception as e:
+            self.logger.logErr("Error dumping telemetry latencies to {}".format(path), e)
 
     def startReceiving(self):
         if (self.receiving == False):
@@ -195,13 +837,12 @@ class ISSTelemetry(PythonWire):
             time.sleep(1)
 
     def checkForStartSignal(self):
-        iss_string1 = str(super().readBytes(42, 200))
-        iss_string2 = str(super().readBytes(42, 200))
+        if(self.experimentStarted):
+            return True
 
-        iss_string = iss_string1 + iss_string2 + iss_string1
-        iss_pos = iss_string.find(START_STRING)
-        if(iss_pos >= 0 and self.experimentStarted != True):
-            self.logger.logInfo("Experiment Start: ISS START SIGNAL RECEIVED: {}".format(iss_string[iss_pos:(len(START_STRING) + iss_pos)]))
+        matcher = self.startMatcher
+        if(self.readInto(self.address, matcher.buffer, start=matcher.overlap) and matcher.match()):
+            self.logger.logInfo("Experiment Start: ISS START SIGNAL RECEIVED: {}".format(START_STRING))
             self.experimentStarted = True
 
         return self.experimentStarted
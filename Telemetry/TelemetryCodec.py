@@ -0,0 +1,115 @@
+from enum import Enum
+
+BINARY_TELEMETRY_VERSION = 0x82 # first byte of a binary packet, text packets start with '"'
+BINARY_FLOAT_SCALE = 100 # floats are sent as fixed point with 2 digits like the text encoding
+BINARY_UNKNOWN_FIELD = 0 # id followed by the length prefixed field name and its type for fields not in the schema
+
+# field types of the binary encoding, the values of TeleDatatypes
+BINARY_INT = 0
+BINARY_FLOAT = 1
+
+def _fields(names : list, fieldType : int):
+    return [(name, fieldType) for name in names]
+
+# Field ids of the binary encoding are the position in this list + 1. The ground receiver uses the
+# same table, so new fields are only ever appended and never change their type.
+TELEMETRY_SCHEMA = (
+    _fields(["system_status", "pb_status"], BINARY_INT) +
+    _fields(["tmp{}_{}".format(n, m) for n in range(1, 7) for m in range(1, 4)], BINARY_FLOAT) +
+    _fields(["heatpad_1", "heatpad_2", "heatpad_3", "heatpad_4", "heatpad_5", "heatpad_6", "multiplexer"], BINARY_INT) +
+    _fields(["p1_volume", "p2_volume", "p3_volume", "p1_status", "p2_status", "p3_status",
+             "p4_volume", "p5_volume", "p6_volume", "p_abeta_volume",
+             "p4_status", "p5_status", "p6_status", "p_abeta_status",
+             "valve1", "valve2", "abeta_status", "p_trap_status"], BINARY_INT) +
+    _fields(["p_trap_amp", "p_trap_freq",
+             "cpu_temp", "cpu", "ram", "sd_volume", "usb_volume",
+             "acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z", "mpu_tmp"], BINARY_FLOAT) +
+    _fields(["timestamp",
+             "mea_1", "mea_2", "mea_3", "mea_4", "mea_5", "mea_6",
+             "error_count", "error_recent"], BINARY_INT) +
+    _fields(["heatpad_{}_mean".format(n) for n in range(1, 7)], BINARY_FLOAT) +
+    _fields(["heatpad_{}_max".format(n) for n in range(1, 7)], BINARY_INT) +
+    _fields(["tele_age_p90", "tele_wait_p90"], BINARY_INT)
+)
+
+FIELD_IDS = {name : n + 1 for n, (name, _) in enumerate(TELEMETRY_SCHEMA)}
+
+class TeleCodec(Enum):
+    TEXT = 0
+    BINARY = 1
+
+    def finishPacket(self, parts : list):
+        """ joins the encoded fields of one packet """
+        if(self == TeleCodec.BINARY):
+            return bytes([BINARY_TELEMETRY_VERSION]) + b"".join(parts)
+        return ",".join(parts) + "\n"
+
+    def packetLength(self, partLengths : int, nParts : int):
+        """ length of a finished packet with nParts fields of partLengths bytes in total """
+        if(self == TeleCodec.BINARY):
+            return 1 + partLengths
+        return partLengths + max(nParts, 1)
+
+
+""" Binary encoding: varint field id followed by a zigzag varint value, floats are scaled by BINARY_FLOAT_SCALE """
+
+def encodeVarint(value : int):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if(value == 0):
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+def decodeVarint(data : bytes, pos : int):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if(byte & 0x80 == 0):
+            return value, pos
+        shift += 7
+
+def zigzag(value : int):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def unzigzag(value : int):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+def encodeBinaryField(name : str, value : int, fieldType : int = BINARY_INT):
+    """ value is the integer to send, floats have to be scaled by the caller. Fields not in the schema or
+    with another type than their schema entry are sent by name with their type """
+    fieldId = FIELD_IDS.get(name)
+    if(fieldId == None or TELEMETRY_SCHEMA[fieldId - 1][1] != fieldType):
+        encodedName = name.encode('utf-8')
+        head = encodeVarint(BINARY_UNKNOWN_FIELD) + encodeVarint(len(encodedName)) + encodedName + bytes([fieldType])
+    else:
+        head = encodeVarint(fieldId)
+    return head + encodeVarint(zigzag(value))
+
+def decodeBinaryPacket(packet : bytes):
+    """ returns dict of field name -> value, float fields are unscaled """
+    if(len(packet) == 0 or packet[0] != BINARY_TELEMETRY_VERSION):
+        raise ValueError("Unknown telemetry packet version")
+
+    fields = {}
+    pos = 1
+    while pos < len(packet):
+        fieldId, pos = decodeVarint(packet, pos)
+        if(fieldId == BINARY_UNKNOWN_FIELD):
+            length, pos = decodeVarint(packet, pos)
+            name = packet[pos:pos + length].decode('utf-8')
+            fieldType = packet[pos + length]
+            pos += length + 1
+        else:
+            name, fieldType = TELEMETRY_SCHEMA[fieldId - 1]
+        value, pos = decodeVarint(packet, pos)
+        value = unzigzag(value)
+        if(fieldType == BINARY_FLOAT):
+            value = value / BINARY_FLOAT_SCALE
+        fields[name] = value
+    return fields
@@ -0,0 +1,99 @@
+import os
+import struct
+import threading
+from Logger.Logger import LOG_DIRECTORY
+
+TELE_SPOOL_FILE = LOG_DIRECTORY + "telemetry.spool"
+TELE_SPOOL_FSYNC = True # sync every added packet (only failed ones are spooled), a lost done record only causes a resend
+
+"""
+Append only spool of unsent telemetry packets:
+    kind (uint8) | sequence number (uint32) | payload length (uint16) | payload
+ADD records hold a packet (text or binary), DONE records (no payload) mark it as sent or dropped.
+A torn record at the end of the file (power loss while writing) is cut off before appending.
+"""
+
+SPOOL_RECORD = struct.Struct("<BIH")
+SPOOL_ADD_TEXT = 0
+SPOOL_ADD_BINARY = 1
+SPOOL_DONE = 2
+
+class TelemetrySpool():
+    def __init__(self, path = TELE_SPOOL_FILE, fsync = TELE_SPOOL_FSYNC):
+        self.path = path
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.pending, validEnd = TelemetrySpool.load(path)
+        self.nextSeq = max(self.pending.keys(), default=-1) + 1
+        if(os.path.isfile(path) and os.path.getsize(path) > validEnd):
+            # records appended behind a torn one would be read as its payload by the next load
+            os.truncate(path, validEnd)
+        self.file = open(path, mode='ab')
+
+    def load(path : str):
+        """ returns sequence number -> packet of all packets without DONE record and the end of the last complete record """
+        pending = {}
+        if(not os.path.isfile(path)):
+            return pending, 0
+
+        with open(path, mode='rb') as file:
+            data = file.read()
+
+        pos = 0
+        while pos + SPOOL_RECORD.size <= len(data):
+            kind, seq, length = SPOOL_RECORD.unpack_from(data, pos)
+            end = pos + SPOOL_RECORD.size + length
+            if(end > len(data)):
+                break
+            payload = data[pos + SPOOL_RECORD.size:end]
+            if(kind == SPOOL_ADD_TEXT):
+                pending[seq] = payload.decode('utf-8', errors='replace')
+            elif(kind == SPOOL_ADD_BINARY):
+                pending[seq] = payload
+            elif(kind == SPOOL_DONE):
+                pending.pop(seq, None)
+            pos = end
+        return pending, pos
+
+    def add(self, packet):
+        """ appends a packet (str or bytes), returns its sequence number """
+        payload = packet.encode('utf-8') if type(packet) == str else bytes(packet)
+        kind = SPOOL_ADD_TEXT if type(packet) == str else SPOOL_ADD_BINARY
+        with self.lock:
+            seq = self.nextSeq
+            self.nextSeq += 1
+            self.pending[seq] = packet
+            self.file.write(SPOOL_RECORD.pack(kind, seq, len(payload)) + payload)
+            self.file.flush()
+            if(self.fsync):
+                os.fsync(self.file.fileno())
+        return seq
+
+    def done(self, seq : int):
+        with self.lock:
+            if(self.pending.pop(seq, None) != None):
+                self.file.write(SPOOL_RECORD.pack(SPOOL_DONE, seq, 0))
+                self.file.flush()
+
+    def takePending(self):
+        """ returns (sequence number, packet) of the packets left by a previous run in spool order """
+        with self.lock:
+            return sorted(self.pending.items())
+
+    def reset(self):
+        """ empties the spool, packets still pending are forgotten """
+        with self.lock:
+            self.pending = {}
+            self.file.truncate(0)
+            self.file.seek(0)
+
+    def getSize(self):
+        with self.lock:
+            return self.file.tell()
+
+    def getPendingCount(self):
+        return len(self.pending)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
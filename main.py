@@ -1,6 +1,8 @@
 from Experiment.Experiment import Experiment
+from Logger.Logger import Logger
 
 def main():
+    Logger.installCrashHandler()
     e = Experiment()
     e.start()
 